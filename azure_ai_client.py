@@ -1,42 +1,297 @@
 import os
 import json
 import re
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
 from dotenv import load_dotenv
-from openai import AzureOpenAI
 from typing import Dict, Any, Optional
+from llm_cache import LLMResponseCache
+from llm_scheduler import AdaptiveConcurrencyLimiter, RateLimitScheduler
+from metrics import REGISTRY, record_llm_usage
 
 # Load environment variables
 load_dotenv()
 
+REGISTRY.define("llm_retries_total", "counter", "Azure OpenAI calls retried, by reason")
+
 class AzureAIClient:
     """Client for interacting with Azure OpenAI services"""
     
     def __init__(self) -> None:
-        """Initialize the Azure OpenAI client"""
+        """Load the Azure OpenAI configuration; the client itself is created on first use"""
         # Load configuration from environment variables
         self.api_key = os.getenv("AZURE_OPENAI_API_KEY")
         self.endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
         self.api_version = os.getenv("AZURE_OPENAI_API_VERSION")
         self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-        self.client = None
+        self.async_client = None
+        self._client = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
         
-        # Initialize Azure OpenAI client
-        try:
-            # Check for required parameters
-            if not all([self.api_key, self.endpoint]):
-                print("❌ Azure OpenAI configuration missing from environment variables")
-                print(f"   API Key: {'✅' if self.api_key else '❌'}")
-                print(f"   Endpoint: {'✅' if self.endpoint else '❌'}")
+        # Disk cache for deterministic-enough prompts such as story generation
+        self.response_cache = LLMResponseCache()
+        
+        # Shared requests/tokens-per-minute budget of the deployment
+        self.scheduler = RateLimitScheduler()
+        
+        # Retries are handled here rather than by the SDK so they can honour a
+        # per-call deadline and feed the adaptive concurrency limit
+        self.limiter = AdaptiveConcurrencyLimiter()
+        self.max_retries = int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "6"))
+        self.request_deadline = float(os.getenv("AZURE_OPENAI_DEADLINE", "120"))
+        self.max_backoff = float(os.getenv("AZURE_OPENAI_MAX_BACKOFF", "30"))
+        # stream_options needs API version 2024-06-01 or later; turned off on its own if rejected
+        self.stream_usage = os.getenv("AZURE_OPENAI_STREAM_USAGE", "true").lower() == "true"
+        REGISTRY.register_callback(
+            "llm_concurrency_limit", "gauge", "Current adaptive limit on concurrent Azure OpenAI calls",
+            lambda: self.limiter.limit
+        )
+    
+    @property
+    def client(self) -> Optional[Any]:
+        """The AzureOpenAI client, or None when it cannot be configured"""
+        if not self._initialized:
+            self._initialize()
+        return self._client
+    
+    def _initialize(self) -> None:
+        """Import the OpenAI SDK and build the client, at most once"""
+        with self._init_lock:
+            if self._initialized:
                 return
+            try:
+                # Check for required parameters
+                if not all([self.api_key, self.endpoint]):
+                    print("❌ Azure OpenAI configuration missing from environment variables")
+                    print(f"   API Key: {'✅' if self.api_key else '❌'}")
+                    print(f"   Endpoint: {'✅' if self.endpoint else '❌'}")
+                    return
+                
+                # The SDK is slow to import, so keep it off the startup path
+                from openai import AzureOpenAI
+                
+                # Initialize the OpenAI client
+                self._client = AzureOpenAI(
+                    api_version=self.api_version,
+                    azure_endpoint=self.endpoint,
+                    api_key=self.api_key,
+                    max_retries=0,
+                )
                 
-            # Initialize the OpenAI client
-            self.client = AzureOpenAI(
-                api_version=self.api_version,
-                azure_endpoint=self.endpoint,
-                api_key=self.api_key,
-            )
+                print(f"✅ Azure OpenAI client initialized with deployment: {self.deployment}")
+            except Exception as e:
+                print(f"❌ Failed to initialize Azure OpenAI client: {e}")
+                self._client = None
+            finally:
+                self._initialized = True
+    
+    def create_chat_completion(self, source: str, **kwargs: Any) -> Any:
+        """
+        Create a chat completion on the configured deployment, recording
+        latency and token usage under the given source label
+        
+        Args:
+            source: Caller name used as the metrics label
+            **kwargs: Arguments for chat.completions.create (messages, tools, stream, ...)
             
-            print(f"✅ Azure OpenAI client initialized with deployment: {self.deployment}")
-        except Exception as e:
-            print(f"❌ Failed to initialize Azure OpenAI client: {e}")
-            self.client = None
\ No newline at end of file
+        Returns:
+            The completion, or a chunk iterator when stream=True
+        """
+        requested_usage = False
+        if kwargs.get("stream") and self.stream_usage and "stream_options" not in kwargs:
+            # Ask for a final usage chunk so streamed calls report tokens too
+            kwargs["stream_options"] = {"include_usage": True}
+            requested_usage = True
+        
+        deadline = time.monotonic() + self.request_deadline
+        estimated_tokens = self.scheduler.estimate_tokens(
+            kwargs.get("messages"), kwargs.get("max_tokens"), kwargs.get("tools")
+        )
+        
+        attempt = 0
+        while True:
+            reserved = self.scheduler.acquire(estimated_tokens, deadline)
+            if reserved is None:
+                raise TimeoutError(f"Azure OpenAI quota exhausted; no capacity within {self.request_deadline:.0f}s")
+            slot = self.limiter.acquire(deadline)
+            if slot is None:
+                self.scheduler.settle(reserved, 0)
+                raise TimeoutError(f"Azure OpenAI is overloaded; no capacity within {self.request_deadline:.0f}s")
+            
+            started = time.perf_counter()
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Azure OpenAI call exceeded its {self.request_deadline:.0f}s deadline")
+                response = self.client.chat.completions.create(model=self.deployment, timeout=remaining, **kwargs)
+            except Exception as e:
+                delay = self._failed_attempt(e, source, attempt, deadline, reserved, slot)
+                
+                if requested_usage and getattr(e, "status_code", None) == 400 and "stream_options" in str(e):
+                    # Older API versions reject the option; keep streaming without token usage
+                    print("⚠️ Azure OpenAI API version does not support stream_options, streaming without token usage")
+                    self.stream_usage = False
+                    requested_usage = False
+                    kwargs.pop("stream_options", None)
+                    continue
+                
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            
+            if kwargs.get("stream"):
+                # The slot stays taken until the stream has been consumed
+                return self._observe_stream(response, source, started, reserved, slot)
+            return self._record(response, source, started, reserved, slot)
+    
+    async def create_chat_completion_async(self, source: str, **kwargs: Any) -> Any:
+        """
+        Non-streaming create_chat_completion() on the asyncio client
+        
+        Shares the rate-limit budget, concurrency limit, retries and
+        deadline with the synchronous calls.
+        
+        Args:
+            source: Caller name used as the metrics label
+            **kwargs: Arguments for chat.completions.create (messages, tools, ...)
+            
+        Returns:
+            The completion
+        """
+        client = self.get_async_client()
+        if client is None:
+            raise RuntimeError("Azure OpenAI client is not initialized")
+        
+        deadline = time.monotonic() + self.request_deadline
+        estimated_tokens = self.scheduler.estimate_tokens(
+            kwargs.get("messages"), kwargs.get("max_tokens"), kwargs.get("tools")
+        )
+        
+        attempt = 0
+        while True:
+            reserved = await self.scheduler.acquire_async(estimated_tokens, deadline)
+            if reserved is None:
+                raise TimeoutError(f"Azure OpenAI quota exhausted; no capacity within {self.request_deadline:.0f}s")
+            # The limiter is shared with threads, so wait for it off the event loop
+            slot = await asyncio.to_thread(self.limiter.acquire, deadline)
+            if slot is None:
+                self.scheduler.settle(reserved, 0)
+                raise TimeoutError(f"Azure OpenAI is overloaded; no capacity within {self.request_deadline:.0f}s")
+            
+            started = time.perf_counter()
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Azure OpenAI call exceeded its {self.request_deadline:.0f}s deadline")
+                response = await client.chat.completions.create(model=self.deployment, timeout=remaining, **kwargs)
+            except Exception as e:
+                delay = self._failed_attempt(e, source, attempt, deadline, reserved, slot)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            return self._record(response, source, started, reserved, slot)
+    
+    def _failed_attempt(self, error: Exception, source: str, attempt: int, deadline: float,
+                        reserved: int, slot: float) -> Optional[float]:
+        """
+        Return a failed attempt's capacity and decide whether to retry it
+        
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        throttled = getattr(error, "status_code", None) == 429
+        self.limiter.release(slot, throttled=throttled, succeeded=False)
+        self.scheduler.settle(reserved, 0)
+        
+        delay = self._retry_delay(error, attempt)
+        if delay is None or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            return None
+        REGISTRY.inc("llm_retries_total", source=source, reason="throttled" if throttled else type(error).__name__)
+        print(f"⚠️ Azure OpenAI call failed ({error.__class__.__name__}), retrying in {delay:.1f}s")
+        return delay
+    
+    def _record(self, response: Any, source: str, started: float, reserved: int, slot: float) -> Any:
+        """Free a completed call's slot and record its latency and token usage"""
+        self.limiter.release(slot)
+        REGISTRY.observe("llm_request_duration_seconds", time.perf_counter() - started, source=source)
+        record_llm_usage(response.usage, source)
+        self.scheduler.settle(reserved, getattr(response.usage, "total_tokens", None))
+        return response
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying a failed call, or None if it should not be retried
+        
+        Throttling and server errors wait at least as long as the Retry-After
+        header asks, even beyond max_backoff (the caller gives up if that
+        passes the deadline); otherwise, and for timeouts and connection
+        errors, full-jitter exponential backoff is used.
+        """
+        from openai import APIConnectionError
+        
+        status = getattr(error, "status_code", None)
+        if not (status == 429 or (status is not None and status >= 500) or isinstance(error, APIConnectionError)):
+            return None
+        
+        retry_after = _retry_after_seconds(getattr(error, "response", None))
+        if retry_after is not None:
+            # A little jitter keeps callers told the same instant from retrying in lockstep
+            return retry_after * random.uniform(1.0, 1.2)
+        return random.uniform(0, min(self.max_backoff, 0.5 * 2 ** attempt))
+    
+    def _observe_stream(self, stream: Any, source: str, started: float, reserved: int, slot: float) -> Any:
+        """Pass chunks through and record metrics once the stream ends"""
+        usage = None
+        completed = False
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                yield chunk
+            completed = True
+        finally:
+            self.limiter.release(slot, succeeded=completed)
+            REGISTRY.observe("llm_request_duration_seconds", time.perf_counter() - started, source=source)
+            record_llm_usage(usage, source)
+            self.scheduler.settle(reserved, getattr(usage, "total_tokens", None))
+    
+    def get_async_client(self) -> Optional[Any]:
+        """Return the asyncio Azure OpenAI client, creating it on first use"""
+        if self.async_client is None and self.client is not None:
+            with self._init_lock:
+                if self.async_client is None:
+                    from openai import AsyncAzureOpenAI
+                    self.async_client = AsyncAzureOpenAI(
+                        api_version=self.api_version,
+                        azure_endpoint=self.endpoint,
+                        api_key=self.api_key,
+                        max_retries=0,
+                    )
+        return self.async_client
+
+
+def _retry_after_seconds(response: Optional[Any]) -> Optional[float]:
+    """Read Retry-After (seconds or HTTP date) or retry-after-ms from a response"""
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,248 @@
+"""
+Stand-in for an Azure OpenAI chat completions deployment
+
+Answers every /chat/completions request, streamed or not, following a
+small script so agent runs are reproducible:
+
+- "CALL <tool> <json args> x<N>" in the latest user message makes the
+  model request that tool N times in parallel (args and xN are optional);
+  once the tool results are in, it answers with a short summary that
+  reports any tool result whose status is "error".
+- Structured story generation (a json_schema response format) returns
+  a fixed number of stories; a backlog plan returns a project with a
+  fixed number of epics, each with that many stories.
+- Anything else gets a short text reply.
+
+Latency is modelled as a time to first token plus a delay per streamed
+chunk. With max_inflight set, requests over that many in flight get a
+429 with Retry-After, like a deployment at its quota.
+
+Run it standalone with:
+    python benchmarks/fake_openai.py --port 8098 --latency 0.2
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CALL_DIRECTIVE = re.compile(r"CALL (\w+)(?: (\{.*?\}))?(?: x(\d+))?")
+
+def _tool_status(content):
+    """The "status" of a JSON tool result, if it has one"""
+    try:
+        result = json.loads(content or "")
+    except ValueError:
+        return None
+    return result.get("status") if isinstance(result, dict) else None
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle's
+    # algorithm and delayed ACKs add ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            throttled = server.max_inflight and server.in_flight > server.max_inflight
+            if throttled:
+                server.throttled += 1
+        try:
+            if throttled:
+                return self._send(429, {"error": {"code": "429", "message": "Rate limit is exceeded"}},
+                                  {"Retry-After": str(server.retry_after)})
+            time.sleep(server.latency)
+            content, tool_calls = server.respond(request)
+            usage = server.usage(request, content, tool_calls)
+            if request.get("stream"):
+                return self._stream(request, content, tool_calls, usage)
+            return self._send(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "usage": usage,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                    "message": {"role": "assistant", "content": content, "tool_calls": tool_calls}
+                }]
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _stream(self, request, content, tool_calls, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta=None, finish_reason=None, chunk_usage=None):
+            choices = [] if chunk_usage else [{"index": 0, "delta": delta or {}, "finish_reason": finish_reason}]
+            payload = {"id": "chatcmpl-stream", "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": request.get("model", "fake"), "choices": choices, "usage": chunk_usage}
+            write(f"data: {json.dumps(payload)}\n\n".encode())
+
+        if tool_calls:
+            for index, call in enumerate(tool_calls):
+                chunk({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                       "function": {"name": call["function"]["name"], "arguments": ""}}]})
+                arguments = call["function"]["arguments"]
+                for start in range(0, len(arguments), 8):
+                    chunk({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + 8]}}]})
+            chunk(finish_reason="tool_calls")
+        else:
+            for start in range(0, len(content), self.server.chunk_chars):
+                chunk({"content": content[start:start + self.server.chunk_chars]})
+                if self.server.chunk_delay:
+                    time.sleep(self.server.chunk_delay)
+            chunk(finish_reason="stop")
+
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunk(chunk_usage=usage)
+        write(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """Threaded fake chat completions server following a fixed script"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, chunk_delay=0.0, stories=4, epics=3, max_inflight=0, retry_after=0.2):
+        """
+        Args:
+            port: Port to listen on (0 picks a free one)
+            latency: Seconds before the first token of every response
+            chunk_delay: Seconds between streamed content chunks
+            stories: Stories returned per story generation request (and per planned epic)
+            epics: Epics returned per backlog plan
+            max_inflight: Concurrent requests served before answering 429 (0 for no limit)
+            retry_after: Retry-After seconds sent with a 429
+        """
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = 16
+        self.stories = stories
+        self.epics = epics
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address):
+        # Clients closing pooled connections are expected, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        """Serve on a daemon thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def respond(self, request):
+        """Return (content, tool_calls) for a request according to the script"""
+        messages = request.get("messages") or []
+        last = messages[-1] if messages else {"role": "user", "content": ""}
+        response_format = request.get("response_format") or {}
+
+        schema_name = (response_format.get("json_schema") or {}).get("name")
+        if response_format.get("type") == "json_schema" and schema_name == "backlog_plan":
+            epics = [{
+                "subject": f"Feature area {number}",
+                "description": f"Everything needed for feature area {number}.",
+                "stories": [{
+                    "subject": f"As a customer I want step {index} of feature area {number}",
+                    "description": f"Acceptance criteria for step {index} of feature area {number}."
+                } for index in range(self.stories)]
+            } for number in range(self.epics)]
+            project = {"name": "Planned project", "description": "Backlog planned from requirements."}
+            return json.dumps({"project": project, "epics": epics}), None
+
+        if response_format.get("type") == "json_schema" and "stories" in json.dumps(response_format):
+            epic = re.search(r"Epic Subject: (.*)", str(last.get("content") or ""))
+            topic = epic.group(1).strip() if epic else "the epic"
+            stories = [{
+                "subject": f"As a customer I want step {index} of {topic}",
+                "description": f"Acceptance criteria for step {index} of {topic}."
+            } for index in range(self.stories)]
+            return json.dumps({"stories": stories}), None
+
+        if last.get("role") == "user" and request.get("tools"):
+            directive = CALL_DIRECTIVE.search(str(last.get("content") or ""))
+            if directive:
+                tool_calls = [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": directive.group(1), "arguments": directive.group(2) or "{}"}
+                } for _ in range(int(directive.group(3) or 1))]
+                return None, tool_calls
+
+        if last.get("role") == "tool":
+            results = [message for message in messages if message.get("role") == "tool"]
+            errors = [message for message in results if _tool_status(message.get("content")) == "error"]
+            if errors:
+                return f"{len(errors)} of {len(results)} tool calls failed: {errors[0].get('content')}", None
+            return f"Done. I looked at {len(results)} tool results and everything is in order.", None
+
+        return "Hello! I can help you plan and organise your Taiga backlog.", None
+
+    @staticmethod
+    def usage(request, content, tool_calls):
+        prompt = sum(len(str(message.get("content") or "")) for message in request.get("messages") or []) // 4
+        completion = len(content or json.dumps(tool_calls or "")) // 4
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--max-inflight", type=int, default=0, help="Answer 429 above this many concurrent requests")
+    args = parser.parse_args()
+
+    server = FakeOpenAI(args.port, args.latency, args.chunk_delay, max_inflight=args.max_inflight)
+    print(f"✅ Fake OpenAI listening on {server.endpoint}")
+    server.serve_forever()
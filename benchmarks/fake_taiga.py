@@ -0,0 +1,257 @@
+"""
+In-memory stand-in for the Taiga REST API
+
+Implements the endpoints the agent uses (auth, projects, epics,
+userstories, bulk creation and related_userstories) with Taiga's
+pagination headers and a configurable per-request latency.
+
+Run it standalone with:
+    python benchmarks/fake_taiga.py --port 8099 --latency 0.02
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TOKEN = "fake-taiga-token"
+COLLECTION_PATH = re.compile(
+    r"^/(projects|epics|userstories)(?:/(\d+))?(/related_userstories/bulk_create|/related_userstories|/bulk_create)?$"
+)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle's
+    # algorithm and delayed ACKs add ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method):
+        server = self.server
+        # Always drain the body so keep-alive connections stay in sync
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path.replace("/api/v1", "", 1)
+        with server.lock:
+            server.requests[method] = server.requests.get(method, 0) + 1
+
+        if path == "/auth" or path == "/auth/refresh":
+            return self._send(200, {"auth_token": TOKEN, "refresh": "fake-refresh", "id": 1})
+        if self.headers.get("Authorization") != f"Bearer {TOKEN}":
+            return self._send(401, {"detail": "Invalid token"})
+
+        match = COLLECTION_PATH.match(path)
+        if not match:
+            return self._send(404, {"detail": "Not found"})
+        kind, object_id, sub = match.group(1), match.group(2), match.group(3)
+
+        with server.lock:
+            if sub == "/bulk_create" and kind == "userstories" and method == "POST":
+                stories = [
+                    server.create("userstories", {"project": body.get("project_id"), "subject": subject, "description": ""})
+                    for subject in body.get("bulk_stories", "").split("\n") if subject
+                ]
+                return self._send(200, stories)
+
+            if sub == "/related_userstories/bulk_create" and method == "POST":
+                for subject in body.get("bulk_userstories", "").split("\n"):
+                    if subject:
+                        story = server.create("userstories", {"project": body.get("project_id"), "subject": subject})
+                        server.links.append((int(object_id), story["id"]))
+                # Like Taiga, answer with every epic/story pair of the epic
+                return self._send(200, [{"epic": epic_id, "user_story": story_id, "order": 0}
+                                        for epic_id, story_id in server.links if epic_id == int(object_id)])
+
+            if sub == "/related_userstories":
+                if method == "POST":
+                    server.links.append((int(object_id), int(body["user_story"])))
+                    return self._send(201, body)
+                stories = [server.data["userstories"][story_id] for epic_id, story_id in server.links
+                           if epic_id == int(object_id) and story_id in server.data["userstories"]]
+                return self._list(stories, query)
+
+            collection = server.data[kind]
+            if object_id:
+                item = collection.get(int(object_id))
+                if item is None:
+                    return self._send(404, {"detail": "Not found"})
+                if method == "GET":
+                    return self._send(200, item)
+                if method == "PATCH":
+                    item.update({key: value for key, value in body.items() if key != "version"})
+                    item["version"] += 1
+                    item["modified_date"] = server.now()
+                    return self._send(200, item)
+                if method == "DELETE":
+                    del collection[int(object_id)]
+                    return self._send(204, None)
+
+            if method == "POST":
+                return self._send(201, server.create(kind, body))
+
+            items = list(collection.values())
+            if "project" in query:
+                items = [item for item in items if str(item.get("project")) == query["project"]]
+            if "epic" in query:
+                linked = {story_id for epic_id, story_id in server.links if str(epic_id) == query["epic"]}
+                items = [item for item in items if item["id"] in linked]
+            if "modified_date__gte" in query:
+                items = [item for item in items if item["modified_date"] >= query["modified_date__gte"]]
+            return self._list(items, query)
+
+    def _list(self, items, query):
+        if "page" not in query and self.headers.get("x-disable-pagination"):
+            return self._send(200, items)
+        page = int(query.get("page", 1))
+        page_size = int(query.get("page_size", self.server.page_size))
+        headers = {"x-paginated": "true", "x-pagination-count": str(len(items))}
+        if page * page_size < len(items):
+            params = "&".join(f"{key}={value}" for key, value in query.items() if key != "page")
+            headers["x-pagination-next"] = f"http://{self.headers['Host']}{urlparse(self.path).path}?{params}&page={page + 1}"
+        return self._send(200, items[(page - 1) * page_size:page * page_size], headers)
+
+    def _send(self, status, payload, headers=None):
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeTaiga(ThreadingHTTPServer):
+    """Threaded fake Taiga server holding its data in memory"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, page_size=30):
+        """
+        Args:
+            port: Port to listen on (0 picks a free one)
+            latency: Seconds added to every request
+            page_size: Default page size of list endpoints
+        """
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.data = {"projects": {}, "epics": {}, "userstories": {}}
+        self.links = []
+        self.requests = {}
+        self._next_id = 0
+        self._thread = None
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1"
+
+    def handle_error(self, request, client_address):
+        # Clients closing pooled connections are expected, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        """Serve on a daemon thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-taiga", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def now(self):
+        return datetime.now(timezone.utc).isoformat()
+
+    def create(self, kind, fields):
+        """Store a new object the way Taiga would return it (call with the lock held)"""
+        self._next_id += 1
+        item = {
+            "description": "",
+            **fields,
+            "id": self._next_id,
+            "ref": self._next_id,
+            "version": 1,
+            "modified_date": self.now(),
+        }
+        if kind == "projects":
+            item.setdefault("members", [1])
+            item["slug"] = f"project-{item['id']}"
+        else:
+            item["project"] = int(item["project"]) if item.get("project") is not None else None
+            item["status_extra_info"] = {"name": "New"}
+        self.data[kind][item["id"]] = item
+        return item
+
+    def seed(self, projects=3, epics_per_project=5, stories_per_epic=8):
+        """
+        Fill the server with linked sample data
+
+        Returns:
+            Dict with the created "projects", "epics" and "stories" ids
+        """
+        created = {"projects": [], "epics": [], "stories": []}
+        with self.lock:
+            for p in range(projects):
+                project = self.create("projects", {"name": f"Project {p}", "description": f"<p>Sample project {p}</p>"})
+                created["projects"].append(project["id"])
+                for e in range(epics_per_project):
+                    epic = self.create("epics", {
+                        "project": project["id"],
+                        "subject": f"Epic {e} of project {p}",
+                        "description": f"<p>Customers need feature area {e} covering search, checkout and reporting.</p>"
+                    })
+                    created["epics"].append(epic["id"])
+                    for s in range(stories_per_epic):
+                        story = self.create("userstories", {
+                            "project": project["id"],
+                            "subject": f"As a customer I want capability {p}-{e}-{s}",
+                            "description": f"Acceptance criteria for capability {p}-{e}-{s}"
+                        })
+                        story["epics"] = [{"id": epic["id"]}]
+                        self.links.append((epic["id"], story["id"]))
+                        created["stories"].append(story["id"])
+        return created
+
+    def request_count(self):
+        with self.lock:
+            return sum(self.requests.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--seed", action="store_true", help="Start with sample projects, epics and stories")
+    args = parser.parse_args()
+
+    server = FakeTaiga(args.port, args.latency)
+    if args.seed:
+        server.seed()
+    print(f"✅ Fake Taiga listening on {server.api_url}")
+    server.serve_forever()
@@ -0,0 +1,372 @@
+"""
+Load generator and soak test for the /api/chat endpoint
+
+Replays a corpus of prompts against /api/chat, either with a fixed number
+of concurrent clients or at a fixed arrival rate, and reports latency
+percentiles, error rates and throughput per interval. The server's
+resident memory is read from /metrics on every interval, so long soak
+runs show whether it keeps growing.
+
+Without --url, the web app is started in a child process against the fake
+Taiga and Azure OpenAI servers, so no real backends are needed.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 16 --duration 60
+    python benchmarks/load_test.py --rate 20 --duration 1800          # soak at 20 requests/s
+    python benchmarks/load_test.py --ramp 1,2,4,8,16,32 --step-duration 20
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --concurrency 8
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_PROMPTS = os.path.join(BENCHMARK_DIR, "prompts.txt")
+
+def load_prompts(path):
+    with open(path) as file:
+        prompts = [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    if not prompts:
+        raise ValueError(f"No prompts in {path}")
+    return prompts
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def summarize(samples, seconds):
+    """Latency percentiles (ms), error rates and throughput of a list of samples"""
+    latencies = sorted(sample["latency"] for sample in samples if sample["outcome"] == "ok")
+    total = len(samples)
+
+    def rate(outcome):
+        return round(sum(1 for sample in samples if sample["outcome"] == outcome) / total, 4) if total else 0.0
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "requests": total,
+        "throughput_rps": round(sum(1 for sample in samples if sample["outcome"] == "ok") / seconds, 2) if seconds else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "error_rate": rate("error"),
+        "rejected_rate": rate("rejected"),
+        "timeout_rate": rate("timeout"),
+    }
+
+
+def memory_growth(timeline, skip_fraction=0.5):
+    """
+    Least-squares slope of server memory in MB per minute
+
+    The first part of the run is skipped because caches and pools fill up
+    while the server warms up.
+    """
+    points = [(point["elapsed"], point["server_rss_mb"]) for point in timeline if point.get("server_rss_mb") is not None]
+    points = points[int(len(points) * skip_fraction):]
+    if len(points) < 3:
+        return None
+    mean_t = statistics.mean(t for t, _ in points)
+    mean_m = statistics.mean(m for _, m in points)
+    variance = sum((t - mean_t) ** 2 for t, _ in points)
+    if not variance:
+        return None
+    slope = sum((t - mean_t) * (m - mean_m) for t, m in points) / variance
+    return round(slope * 60, 3)
+
+
+class LoadTest:
+    """Sends chat requests and records one sample per request"""
+
+    def __init__(self, url, prompts, sessions=20, timeout=120.0):
+        self.url = url.rstrip("/")
+        self.prompts = prompts
+        self.session_ids = [uuid.uuid4().hex for _ in range(sessions)] if sessions else []
+        self.timeout = timeout
+        self.samples = []
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _http(self):
+        # One connection pool per client thread, like independent browsers
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, scheduled=None):
+        """
+        Send one random prompt and record the outcome
+
+        Args:
+            scheduled: Monotonic time the request was due; latency is measured
+                from it so queueing in an overloaded client is not hidden
+        """
+        payload = {"message": random.choice(self.prompts)}
+        if self.session_ids:
+            payload["session_id"] = random.choice(self.session_ids)
+
+        started = scheduled or time.monotonic()
+        try:
+            response = self._http().post(f"{self.url}/api/chat", json=payload, timeout=self.timeout)
+            if response.status_code == 503:
+                outcome = "rejected"
+            elif response.status_code != 200 or str(response.json().get("response", "")).startswith("Error:"):
+                outcome = "error"
+            else:
+                outcome = "ok"
+        except requests.Timeout:
+            outcome = "timeout"
+        except Exception:
+            outcome = "error"
+
+        finished = time.monotonic()
+        with self._lock:
+            self.samples.append({"start": started - self.started, "end": finished - self.started,
+                                 "latency": finished - started, "outcome": outcome})
+
+    def run_closed_loop(self, concurrency, duration):
+        """Keep `concurrency` requests in flight for `duration` seconds"""
+        deadline = time.monotonic() + duration
+
+        def client():
+            while time.monotonic() < deadline:
+                self.send()
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open_loop(self, rate, duration, max_in_flight=512):
+        """Start requests at Poisson-distributed times averaging `rate` per second"""
+        deadline = time.monotonic() + duration
+        next_arrival = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as executor:
+            while next_arrival < deadline:
+                delay = next_arrival - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, next_arrival)
+                next_arrival += random.expovariate(rate)
+
+    def samples_between(self, start, end):
+        with self._lock:
+            return [sample for sample in self.samples if start <= sample["end"] < end]
+
+
+def server_memory_mb(url):
+    """Resident memory of the server process from its /metrics endpoint, if exposed"""
+    try:
+        text = requests.get(f"{url.rstrip('/')}/metrics", timeout=5).text
+        match = re.search(r"^process_resident_memory_bytes (\S+)$", text, re.MULTILINE)
+        return round(float(match.group(1)) / 1024 / 1024, 1) if match else None
+    except Exception:
+        return None
+
+
+def report_intervals(load_test, interval, stop, timeline):
+    """Print one line per interval until stop is set"""
+    print(f"{'time':>6} {'reqs':>6} {'rps':>7} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'err%':>6} {'503%':>6} {'rss MB':>8}")
+    window_start = 0.0
+    while not stop.wait(interval):
+        window_end = time.monotonic() - load_test.started
+        stats = summarize(load_test.samples_between(window_start, window_end), window_end - window_start)
+        stats["elapsed"] = round(window_end, 1)
+        stats["server_rss_mb"] = server_memory_mb(load_test.url)
+        timeline.append(stats)
+        print(f"{stats['elapsed']:>6.0f} {stats['requests']:>6} {stats['throughput_rps']:>7} "
+              f"{stats['p50_ms'] or '-':>8} {stats['p95_ms'] or '-':>8} {stats['p99_ms'] or '-':>8} "
+              f"{stats['error_rate'] * 100:>6.1f} {stats['rejected_rate'] * 100:>6.1f} {stats['server_rss_mb'] or '-':>8}")
+        window_start = window_end
+
+
+def run_ramp(url, prompts, args):
+    """Step through concurrency levels and find where throughput stops scaling"""
+    steps = []
+    for concurrency in [int(level) for level in args.ramp.split(",")]:
+        load_test = LoadTest(url, prompts, args.sessions, args.timeout)
+        load_test.run_closed_loop(concurrency, args.step_duration)
+        stats = summarize(load_test.samples, args.step_duration)
+        stats["concurrency"] = concurrency
+        stats["server_rss_mb"] = server_memory_mb(url)
+        steps.append(stats)
+        print(f"   concurrency {concurrency:>4}: {stats['throughput_rps']:>7} req/s, p50 {stats['p50_ms']} ms, "
+              f"p95 {stats['p95_ms']} ms, errors {stats['error_rate']:.1%}, 503 {stats['rejected_rate']:.1%}")
+
+    # Saturated once more clients add under 10% throughput or start failing
+    saturation = None
+    for previous, step in zip(steps, steps[1:]):
+        failing = step["error_rate"] + step["rejected_rate"] + step["timeout_rate"] > args.max_error_rate
+        if failing or step["throughput_rps"] < previous["throughput_rps"] * 1.1:
+            saturation = previous
+            break
+    if saturation:
+        print(f"⚠️ Saturates at about {saturation['concurrency']} concurrent chats "
+              f"({saturation['throughput_rps']} req/s, p95 {saturation['p95_ms']} ms)")
+    else:
+        print("✅ Throughput still scaled at the highest concurrency tested")
+    return {"mode": "ramp", "steps": steps, "saturation": saturation}
+
+
+def run_load(url, prompts, args):
+    load_test = LoadTest(url, prompts, args.sessions, args.timeout)
+    timeline = []
+    stop = threading.Event()
+    reporter = threading.Thread(target=report_intervals, args=(load_test, args.interval, stop, timeline), daemon=True)
+    reporter.start()
+
+    memory_before = server_memory_mb(url)
+    if args.rate:
+        load_test.run_open_loop(args.rate, args.duration)
+    else:
+        load_test.run_closed_loop(args.concurrency, args.duration)
+    stop.set()
+    reporter.join()
+
+    elapsed = max(sample["end"] for sample in load_test.samples) if load_test.samples else args.duration
+    overall = summarize(load_test.samples, elapsed)
+    growth = memory_growth(timeline)
+    memory_after = server_memory_mb(url)
+
+    print(f"\nTotal: {overall['requests']} requests, {overall['throughput_rps']} req/s, "
+          f"p50 {overall['p50_ms']} ms, p95 {overall['p95_ms']} ms, p99 {overall['p99_ms']} ms")
+    print(f"Errors {overall['error_rate']:.2%}, rejected {overall['rejected_rate']:.2%}, timeouts {overall['timeout_rate']:.2%}")
+    if memory_before is not None and memory_after is not None:
+        print(f"Server memory {memory_before} MB -> {memory_after} MB"
+              + (f", {growth:+} MB/min after warm-up" if growth is not None else ""))
+
+    return {
+        "mode": "rate" if args.rate else "concurrency",
+        "overall": overall,
+        "timeline": timeline,
+        "server_memory_mb": {"before": memory_before, "after": memory_after, "growth_mb_per_min": growth},
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stand_in_server(args):
+    """Run the web app against the fake backends in a child process; returns (process, url)"""
+    port = free_port()
+    command = [sys.executable, os.path.abspath(__file__), "--serve", str(port),
+               "--taiga-latency", str(args.taiga_latency), "--model-latency", str(args.model_latency)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL if not args.verbose else None,
+                               stderr=subprocess.STDOUT if not args.verbose else None)
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Stand-in server exited during startup; rerun with --verbose to see why")
+        try:
+            if requests.get(f"{url}/api/ready", timeout=2).status_code == 200:
+                return process, url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Stand-in server did not become ready within 60s")
+
+
+def serve(port, args):
+    """Child process entry point: fake backends plus the production WSGI app"""
+    sys.path.insert(0, BENCHMARK_DIR)
+    sys.path.insert(0, REPO_DIR)
+    from stand_ins import StandIns
+    StandIns(args.taiga_latency, args.model_latency)
+
+    sys.path.insert(0, os.path.join(REPO_DIR, "frontend"))
+    from werkzeug.serving import make_server
+    from wsgi import app
+
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running app (default: start one against the stand-in backends)")
+    parser.add_argument("--prompts", default=DEFAULT_PROMPTS, help="File with one prompt per line")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients in closed-loop mode")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate in requests per second")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument("--ramp", help="Comma-separated concurrency levels to find the saturation point")
+    parser.add_argument("--step-duration", type=float, default=20, help="Seconds per ramp level")
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between progress lines")
+    parser.add_argument("--sessions", type=int, default=20, help="Chat sessions the requests are spread over (0 for none)")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Failed share of requests that fails the run")
+    parser.add_argument("--max-memory-growth", type=float, default=2.0, help="MB/min of server memory growth that fails the run")
+    parser.add_argument("--taiga-latency", type=float, default=0.005, help="Fake Taiga latency (stand-in mode)")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Fake model time to first token (stand-in mode)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the stand-in server's output")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args)
+        return 0
+
+    prompts = load_prompts(args.prompts)
+    process = None
+    url = args.url
+    if not url:
+        print("⏳ Starting the app against the stand-in backends")
+        process, url = start_stand_in_server(args)
+    print(f"✅ Target {url}")
+
+    try:
+        report = run_ramp(url, prompts, args) if args.ramp else run_load(url, prompts, args)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report["settings"] = {key: value for key, value in vars(args).items() if key not in ("serve", "verbose")}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+    if args.ramp:
+        return 0
+    overall = report["overall"]
+    failed_share = overall["error_rate"] + overall["rejected_rate"] + overall["timeout_rate"]
+    growth = report["server_memory_mb"]["growth_mb_per_min"]
+    if failed_share > args.max_error_rate:
+        print(f"❌ {failed_share:.2%} of requests failed (limit {args.max_error_rate:.2%})")
+        return 1
+    if growth is not None and growth > args.max_memory_growth:
+        print(f"❌ Server memory kept growing at {growth} MB/min (limit {args.max_memory_growth})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Offline benchmarks for the agent, the story generator and the Taiga managers
+
+Starts the fake Taiga and Azure OpenAI servers from this directory in
+process, points the agent at them and measures:
+
+- single_turn: latency of a plain chat turn
+- fan_out: latency of a turn whose model reply requests several tools at once
+- manager_reads: Taiga list reads with a cold and a warm response cache
+- breakdown: epic breakdown throughput, with and without a cached completion
+
+Results are written to benchmarks/results/ and compared with the saved
+baseline; a metric worse than the baseline by more than the tolerance is
+reported as a regression and makes the run exit with status 1 (tail
+latencies are only reported). Failed tool calls in the fan-out turns
+fail the run outright.
+
+Usage:
+    python benchmarks/run_benchmarks.py                   # run and compare
+    python benchmarks/run_benchmarks.py --save-baseline   # record a new baseline
+    python benchmarks/run_benchmarks.py --only fan_out --iterations 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from stand_ins import StandIns
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+def metric(value, unit, better="lower", gated=True, limit=None):
+    """
+    A measurement; ungated metrics are reported but never fail the run
+
+    A metric with a limit fails the run whenever it exceeds that limit,
+    whatever the baseline says.
+    """
+    measured = {"value": round(value, 3), "unit": unit, "better": better, "gated": gated}
+    if limit is not None:
+        measured["limit"] = limit
+    return measured
+
+
+def latency_metrics(samples, prefix=""):
+    """p50/p95 in milliseconds of a list of durations in seconds"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        f"{prefix}p50_ms": metric(statistics.median(ordered) * 1000, "ms"),
+        # Tail latency over a few dozen samples is too noisy to gate on
+        f"{prefix}p95_ms": metric(p95 * 1000, "ms", gated=False),
+    }
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+class BenchmarkEnvironment:
+    """Fake servers plus an agent configured to use them"""
+
+    def __init__(self, args):
+        self.stand_ins = StandIns(args.taiga_latency, args.model_latency, args.chunk_delay)
+        self.taiga_server = self.stand_ins.taiga
+        self.seeded = self.stand_ins.seeded
+
+        # Imported only now so every module reads the environment above
+        from requirement_analyzer_agent import RequirementAnalyzerAgent
+        self.agent = RequirementAnalyzerAgent()
+        self.agent.warm_up(background=False)
+
+    def close(self):
+        self.agent.job_queue.stop()
+        self.stand_ins.stop()
+
+
+def bench_single_turn(env, iterations):
+    samples = []
+    for _ in range(iterations):
+        duration, _ = timed(env.agent.run_conversation, "Hello, what can you do?", uuid.uuid4().hex)
+        samples.append(duration)
+    return latency_metrics(samples)
+
+
+def run_turn_events(agent, prompt):
+    """Run one chat turn and return its events"""
+    return list(agent.run_conversation_stream(prompt, uuid.uuid4().hex))
+
+
+def bench_fan_out(env, iterations, width=8):
+    project_id = env.seeded["projects"][0]
+    prompt = f'CALL list_epics {{"project_id": "{project_id}"}} x{width}'
+    samples = []
+    failed_calls = 0
+    requests_before = env.taiga_server.request_count()
+    for _ in range(iterations):
+        duration, events = timed(run_turn_events, env.agent, prompt)
+        samples.append(duration)
+        # A fast turn whose tools failed is not a result; every scripted call must succeed
+        finished = [event for event in events if event["type"] == "tool_finished"]
+        failed_calls += width - len(finished) + sum(1 for event in finished if event["status"] == "error")
+    results = latency_metrics(samples)
+    results["taiga_requests_per_turn"] = metric(
+        (env.taiga_server.request_count() - requests_before) / iterations, "requests"
+    )
+    results["failed_tool_calls"] = metric(failed_calls, "calls", limit=0)
+    return results
+
+
+def bench_manager_reads(env, iterations):
+    from taigaApi.epic_manager import EpicManager
+
+    taiga = env.agent.taiga_api
+    epic_manager = EpicManager(taiga)
+    project_id = env.seeded["projects"][0]
+
+    cold = []
+    for _ in range(iterations):
+        taiga.cache.clear()
+        cold.append(timed(epic_manager.get_epics, project_id)[0])
+    warm = [timed(epic_manager.get_epics, project_id)[0] for _ in range(iterations)]
+
+    return {**latency_metrics(cold, "cold_"), **latency_metrics(warm, "warm_")}
+
+
+def bench_breakdown(env, iterations):
+    from taigaApi.story_generator import StoryGenerator
+    from taigaApi.taiga_api import TaigaAPI
+
+    # A client without the duplicate index, so repeated runs keep creating stories
+    generator = StoryGenerator(TaigaAPI(), env.agent.ai_client)
+    project_id = env.seeded["projects"][1]
+    epics = env.seeded["epics"][5:10]
+
+    created = 0
+    started = time.perf_counter()
+    for epic_id in epics:
+        created += sum(1 for result in generator.breakdown_epic_into_stories(project_id, epic_id, use_cache=False)
+                       if result["story"])
+    generation_seconds = time.perf_counter() - started
+
+    uncached = [timed(generator.breakdown_epic_into_stories, project_id, epics[0], use_cache=False)[0]
+                for _ in range(iterations)]
+    cached = [timed(generator.breakdown_epic_into_stories, project_id, epics[0], use_cache=True)[0]
+              for _ in range(iterations)]
+
+    return {
+        "stories_per_second": metric(created / generation_seconds, "stories/s", "higher"),
+        **latency_metrics(uncached, "uncached_epic_"),
+        **latency_metrics(cached, "cached_epic_"),
+    }
+
+
+BENCHMARKS = {
+    "single_turn": bench_single_turn,
+    "fan_out": bench_fan_out,
+    "manager_reads": bench_manager_reads,
+    "breakdown": bench_breakdown,
+}
+
+
+def compare(results, baseline, tolerance, min_delta_ms=1.0):
+    """
+    Compare results with a baseline
+
+    Latency changes smaller than min_delta_ms are never regressions, so
+    sub-millisecond cache hits do not flap.
+
+    Returns:
+        List of (name, baseline value, current value, change) for regressions
+    """
+    regressions = []
+    for bench, metrics in results["benchmarks"].items():
+        for name, current in metrics.items():
+            previous = baseline.get("benchmarks", {}).get(bench, {}).get(name)
+            if not previous or not previous["value"]:
+                continue
+            change = (current["value"] - previous["value"]) / previous["value"]
+            worse = change > tolerance if current["better"] == "lower" else change < -tolerance
+            if current["unit"] == "ms" and abs(current["value"] - previous["value"]) < min_delta_ms:
+                worse = False
+            marker = "✅" if not worse else "❌" if current.get("gated", True) else "⚠️"
+            print(f"{marker} {bench}.{name}: {previous['value']} -> {current['value']} {current['unit']} ({change:+.1%})")
+            if worse and current.get("gated", True):
+                regressions.append((f"{bench}.{name}", previous["value"], current["value"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="Comma-separated benchmarks to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=20, help="Samples per measurement")
+    parser.add_argument("--taiga-latency", type=float, default=0.005, help="Seconds added to each fake Taiga request")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Fake model time to first token")
+    parser.add_argument("--chunk-delay", type=float, default=0.002, help="Fake model delay per streamed chunk")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown before flagging a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare with")
+    args = parser.parse_args()
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    env = BenchmarkEnvironment(args)
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("only", "save_baseline", "baseline")},
+        "benchmarks": {},
+    }
+    try:
+        for name in selected:
+            print(f"⏳ Running {name}")
+            results["benchmarks"][name] = BENCHMARKS[name](env, args.iterations)
+            for metric_name, value in results["benchmarks"][name].items():
+                print(f"   {metric_name}: {value['value']} {value['unit']}")
+    finally:
+        env.close()
+
+    failures = [
+        (f"{bench}.{name}", value) for bench, metrics in results["benchmarks"].items()
+        for name, value in metrics.items() if "limit" in value and value["value"] > value["limit"]
+    ]
+    for name, value in failures:
+        print(f"❌ {name}: {value['value']} {value['unit']} (must be at most {value['limit']})")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    run_path = os.path.join(RESULTS_DIR, f"run-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(run_path, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"✅ Results written to {run_path}")
+
+    if failures:
+        print(f"❌ {len(failures)} metrics are over their limit; not comparing or saving a baseline")
+        return 1
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("⚠️ No baseline to compare with; run with --save-baseline first")
+        return 0
+
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
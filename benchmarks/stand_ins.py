@@ -0,0 +1,41 @@
+"""Start the fake Taiga and Azure OpenAI servers and point the environment at them"""
+import os
+import tempfile
+
+from fake_openai import FakeOpenAI
+from fake_taiga import FakeTaiga
+
+class StandIns:
+    """Running fake backends, seeded with sample data"""
+
+    def __init__(self, taiga_latency=0.005, model_latency=0.05, chunk_delay=0.002, max_inflight=0):
+        """
+        Starts both servers and sets TAIGA_API_URL, the AZURE_OPENAI_*
+        settings and the SQLite file paths, so agents created afterwards in
+        this process (or in child processes) use the stand-ins.
+
+        Args:
+            taiga_latency: Seconds added to each fake Taiga request
+            model_latency: Fake model time to first token
+            chunk_delay: Fake model delay per streamed chunk
+            max_inflight: Fake model concurrency before it answers 429 (0 for no limit)
+        """
+        self.taiga = FakeTaiga(latency=taiga_latency).start()
+        self.openai = FakeOpenAI(latency=model_latency, chunk_delay=chunk_delay, max_inflight=max_inflight).start()
+        self.seeded = self.taiga.seed(projects=3, epics_per_project=5, stories_per_epic=8)
+        self.workdir = tempfile.mkdtemp(prefix="taiga-bench-")
+
+        os.environ.update({
+            "TAIGA_API_URL": self.taiga.api_url,
+            "AZURE_OPENAI_ENDPOINT": self.openai.endpoint,
+            "AZURE_OPENAI_API_KEY": "benchmark",
+            "AZURE_OPENAI_API_VERSION": "2024-06-01",
+            "AZURE_OPENAI_DEPLOYMENT": "benchmark",
+            "LLM_CACHE_PATH": os.path.join(self.workdir, "llm_cache.sqlite3"),
+            "JOB_QUEUE_PATH": os.path.join(self.workdir, "jobs.sqlite3"),
+            "TAIGA_MIRROR_PATH": os.path.join(self.workdir, "mirror.sqlite3"),
+        })
+
+    def stop(self):
+        self.taiga.stop()
+        self.openai.stop()
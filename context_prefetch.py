@@ -0,0 +1,170 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from metrics import REGISTRY
+
+REGISTRY.define("context_prefetch_total", "counter", "Prefetched Taiga context sections injected into chats, by section")
+
+# First line of every injected message; also how earlier injections are found in a session's history
+CONTEXT_HEADER = "Taiga context prefetched for this conversation"
+
+# Section headings, parsed back from the history to avoid sending a section twice.
+# A section cut short by the token budget is prefixed with the items it
+# covers, and a later turn continues from there.
+_PROJECTS_HEADING = "Projects (id: name, epics, stories):"
+_DELIVERED = re.compile(
+    r"^(?:\(items \d+-(\d+) of \d+\) )?(?:(Projects) \(|Epics of project (\d+) |Stories of epic (\d+) )",
+    re.MULTILINE
+)
+
+# Names shorter than this are too likely to match ordinary words
+MIN_NAME_LENGTH = 3
+STORIES_PER_EPIC = 20
+
+class ContextPrefetcher:
+    """
+    Compact project, epic and story overviews for the agent, read from the Taiga mirror
+
+    Conversations usually open with list_projects, list_epics and
+    list_user_stories calls, each costing a model round trip. The mirror
+    is brought up to date in the background when a session opens, and the
+    first turn gets the project overview as a system message, plus the
+    epics of projects (and the stories of epics) named in the message.
+    Sections already in the session's history are not sent again; one cut
+    short by the token budget continues where it stopped on the next turn.
+    """
+
+    def __init__(self, mirror, max_wait: Optional[float] = None, token_budget: Optional[int] = None) -> None:
+        """
+        Args:
+            mirror: TaigaMirror to read from
+            max_wait: Seconds a turn waits for an in-flight refresh (CONTEXT_PREFETCH_WAIT, 1)
+            token_budget: Approximate size limit of one injected message (CONTEXT_PREFETCH_TOKENS, 800)
+        """
+        self.mirror = mirror
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("CONTEXT_PREFETCH_WAIT", "1"))
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_PREFETCH_TOKENS", "800"))
+        self.enabled = os.getenv("CONTEXT_PREFETCH_DISABLED", "false").lower() != "true"
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-prefetch")
+        self._refresh = None
+        self._lock = threading.Lock()
+
+    def prefetch(self):
+        """
+        Start refreshing the mirror in the background unless it is fresh
+
+        Concurrent callers share one refresh.
+
+        Returns:
+            Future of the refresh, or None when nothing needed doing
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._refresh is not None and not self._refresh.done():
+                return self._refresh
+            if self.mirror.is_fresh():
+                return None
+            self._refresh = self._executor.submit(self.mirror.ensure_fresh)
+            return self._refresh
+
+    def context_message(self, user_input: str, history: List[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+        """
+        Build the system message to place before the user's message
+
+        Args:
+            user_input: The user's new message, searched for project and epic names
+            history: The session's earlier messages
+
+        Returns:
+            A system message, or None when there is nothing new to add or
+            the mirror has not been synced by this process yet
+        """
+        if not self.enabled:
+            return None
+
+        refresh = self.prefetch()
+        if refresh is not None:
+            wait([refresh], timeout=self.max_wait)
+        if self.mirror.synced_at is None:
+            # An old or empty mirror file would be worse than letting the model list
+            return None
+
+        try:
+            return self._build(user_input or "", history)
+        except Exception as e:
+            print(f"⚠️ Could not build prefetched context: {e}")
+            return None
+
+    def _build(self, user_input, history):
+        earlier = "\n".join(
+            message.get("content") or "" for message in history
+            if message.get("role") == "system" and (message.get("content") or "").startswith(CONTEXT_HEADER)
+        )
+        # Items already sent per section; a complete section counts as everything
+        delivered = {}
+        for shown, projects_section, project_id, epic_id in _DELIVERED.findall(earlier):
+            key = ("projects", None) if projects_section else ("epics", int(project_id)) if project_id else ("stories", int(epic_id))
+            delivered[key] = max(delivered.get(key, 0), int(shown) if shown else float("inf"))
+
+        projects = self.mirror.project_overview()
+        text = user_input.lower()
+        sections = []
+
+        if projects:
+            lines = [f"- {project['id']}: {project['name']}, {project['epics']} epics, {project['user_stories']} stories"
+                     for project in projects]
+            sections.append((("projects", None), _PROJECTS_HEADING, lines))
+
+        # A lone project is what every request is about
+        detailed = [project for project in projects if len(projects) == 1 or _mentions(text, project["name"])]
+        for project in detailed:
+            epics = self.mirror.epic_overview(project["id"])
+            if epics:
+                lines = [f"- {epic['id']}: {epic['subject']}, {epic['user_stories']} stories" for epic in epics]
+                sections.append((("epics", project["id"]), f"Epics of project {project['id']} \"{project['name']}\" (id: subject, stories):", lines))
+
+            for epic in epics:
+                if delivered.get(("stories", epic["id"])) == float("inf") or not epic["user_stories"] \
+                        or not _mentions(text, epic["subject"]):
+                    continue
+                stories = self.mirror.list_user_stories(epic["id"])
+                lines = [f"- {story['id']}: {story.get('subject')}" for story in stories[:STORIES_PER_EPIC]]
+                if len(stories) > STORIES_PER_EPIC:
+                    lines.append(f"- ... {len(stories) - STORIES_PER_EPIC} more, use list_user_stories")
+                sections.append((("stories", epic["id"]), f"Stories of epic {epic['id']} \"{epic['subject']}\" (id: subject):", lines))
+
+        parts = [f"{CONTEXT_HEADER} (a snapshot; use it instead of calling list tools for these items, and use the tools for anything newer or not listed):"]
+        used = len(parts[0]) // 4
+        for key, heading, lines in sections:
+            start = delivered.get(key, 0)
+            if start >= len(lines):
+                continue
+            kept = []
+            for line in lines[start:]:
+                if used + len(line) // 4 + 1 > self.token_budget:
+                    break
+                kept.append(line)
+                used += len(line) // 4 + 1
+            if not kept:
+                break
+            if start or start + len(kept) < len(lines):
+                heading = f"(items {start + 1}-{start + len(kept)} of {len(lines)}) {heading}"
+            if start + len(kept) < len(lines):
+                kept.append(f"- ... {len(lines) - start - len(kept)} more not shown yet, use the list tools if needed now")
+            parts.append("\n".join([heading, *kept]))
+            REGISTRY.inc("context_prefetch_total", section=key[0])
+
+        if len(parts) == 1:
+            return None
+        return {"role": "system", "content": "\n".join(parts)}
+
+def _mentions(text, name):
+    """True when a name appears in lowercased text as a whole phrase"""
+    name = (name or "").strip().lower()
+    if len(name) < MIN_NAME_LENGTH:
+        return False
+    return re.search(r"(?<!\w)" + re.escape(name) + r"(?!\w)", text) is not None
@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+class ConversationMemory:
+    """Per-session conversation history with a token budget and LRU eviction"""
+
+    def __init__(self, max_sessions: Optional[int] = None, token_budget: Optional[int] = None) -> None:
+        self.max_sessions = max_sessions or int(os.getenv("AGENT_MAX_SESSIONS", "100"))
+        self.token_budget = token_budget or int(os.getenv("AGENT_HISTORY_TOKENS", "6000"))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        # Held by callers for a whole turn; dropped once no caller references it
+        self._session_locks = weakref.WeakValueDictionary()
+
+    def session_lock(self, session_id: str) -> threading.Lock:
+        """Return the lock that serializes turns of one session across requests"""
+        with self._lock:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.Lock()
+            return lock
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return a copy of the stored messages for a session"""
+        with self._lock:
+            messages = self._sessions.get(session_id)
+            if messages is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            return list(messages)
+
+    def save(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Store a session's messages, compacting them to fit the token budget"""
+        messages = self._compact(list(messages))
+        with self._lock:
+            self._sessions[session_id] = messages
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _compact(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Shrink a history that exceeds the token budget
+
+        Tool results from earlier turns are replaced with short summaries
+        first. If that is not enough, the oldest whole turns are dropped,
+        always keeping the latest one so tool calls stay paired with results.
+        """
+        if self._estimate_tokens(messages) <= self.token_budget:
+            return messages
+
+        turn_starts = [index for index, message in enumerate(messages) if message.get("role") == "user"]
+        latest_turn = turn_starts[-1] if turn_starts else 0
+
+        for index in range(latest_turn):
+            message = messages[index]
+            if message.get("role") == "tool":
+                messages[index] = dict(message, content=summarize_tool_result(message.get("content")))
+
+        while self._estimate_tokens(messages) > self.token_budget and len(turn_starts) > 1:
+            drop_until = turn_starts[1]
+            messages = messages[drop_until:]
+            turn_starts = [index - drop_until for index in turn_starts[1:]]
+
+        return messages
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+        """Rough token count (about four characters per token)"""
+        characters = 0
+        for message in messages:
+            characters += len(message.get("content") or "")
+            for tool_call in message.get("tool_calls") or []:
+                characters += len(tool_call["function"]["arguments"]) + len(tool_call["function"]["name"])
+        return characters // 4
+
+
+def summarize_tool_result(content: Optional[str], max_items: int = 20) -> str:
+    """
+    Reduce a tool's JSON result to its status, counts and item identifiers
+
+    Args:
+        content: JSON string returned by a taiga_functions tool
+        max_items: Maximum number of list items to keep
+
+    Returns:
+        JSON string marked with "compacted": true
+    """
+    try:
+        data = json.loads(content or "{}")
+    except ValueError:
+        return json.dumps({"compacted": True, "text": (content or "")[:200]})
+
+    if not isinstance(data, dict) or data.get("compacted"):
+        return content
+
+    summary = {"compacted": True}
+    for key, value in data.items():
+        if isinstance(value, list):
+            summary[key] = [_identify(item) for item in value[:max_items]]
+        elif isinstance(value, dict):
+            summary[key] = _identify(value)
+        elif not isinstance(value, str) or len(value) <= 200:
+            summary[key] = value
+    return json.dumps(summary)
+
+
+def _identify(item: Any) -> Any:
+    """Keep only the fields that identify a Taiga object"""
+    if not isinstance(item, dict):
+        return item
+    return {key: item[key] for key in ("id", "name", "subject", "status") if key in item}
@@ -1,44 +1,227 @@
 import os
 import sys
+import json
+import threading
 
 # Add the parent directory to sys.path to be able to import modules from the root directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Blueprint, Response, current_app, render_template, request, jsonify, stream_with_context
 from requirement_analyzer_agent import RequirementAnalyzerAgent
+from metrics import REGISTRY
+from job_queue import FINISHED_STATUSES
 
-app = Flask(__name__)
-app.static_folder = 'static'
+bp = Blueprint('chat', __name__)
 
-# Initialize the Requirement Analyzer Agent
-agent = RequirementAnalyzerAgent()
+REGISTRY.define("chat_rejected_total", "counter", "Chat requests rejected with 503 because all slots were busy")
 
-@app.route('/')
+class AgentHolder:
+    """Creates an app's agent on first use so the server can bind immediately"""
+    
+    def __init__(self, factory=RequirementAnalyzerAgent):
+        self.factory = factory
+        self._agent = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Return the agent, creating it and starting its warm-up on first use"""
+        if self._agent is None:
+            with self._lock:
+                if self._agent is None:
+                    agent = self.factory()
+                    agent.warm_up()
+                    self._agent = agent
+        return self._agent
+
+def create_app(agent_factory=None, max_concurrent_chats=None):
+    """
+    Build the chat application
+    
+    The agent is shared by every request handler thread of the app; chat
+    state is kept per session_id. At most max_concurrent_chats chats run
+    at once, further ones get an immediate 503 instead of queueing.
+    
+    Args:
+        agent_factory: Callable returning the agent (defaults to RequirementAnalyzerAgent)
+        max_concurrent_chats: Chat slots (defaults to CHAT_MAX_CONCURRENT or 32)
+    
+    Returns:
+        Flask application
+    """
+    app = Flask(__name__)
+    app.static_folder = 'static'
+    
+    slots = max_concurrent_chats or int(os.getenv("CHAT_MAX_CONCURRENT", "32"))
+    app.extensions['taiga_agent'] = AgentHolder(agent_factory or RequirementAnalyzerAgent)
+    app.extensions['chat_slots'] = threading.BoundedSemaphore(slots)
+    
+    app.register_blueprint(bp)
+    return app
+
+def get_agent():
+    """Return the current app's agent"""
+    return current_app.extensions['taiga_agent'].get()
+
+def acquire_chat_slot():
+    """Take a chat slot without waiting; returns the release callback, or None when saturated"""
+    slots = current_app.extensions['chat_slots']
+    if not slots.acquire(blocking=False):
+        REGISTRY.inc("chat_rejected_total")
+        return None
+    return slots.release
+
+def busy_response():
+    response = jsonify({'response': 'The server is busy right now, please try again in a moment.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+@bp.route('/')
 def index():
     """Render the main chat interface"""
     return render_template('index.html')
 
-@app.route('/api/chat', methods=['POST'])
+@bp.route('/api/chat', methods=['POST'])
 def chat():
     """API endpoint for chat functionality"""
     user_input = request.json.get('message', '')
+    session_id = request.json.get('session_id')
     
     if not user_input.strip():
         return jsonify({'response': 'Please enter a message.'})
     
+    release = acquire_chat_slot()
+    if release is None:
+        return busy_response()
+    
     # Get response from the agent
     try:
-        response = agent.run_conversation(user_input)
+        response = get_agent().run_conversation(user_input, session_id)
         return jsonify({'response': response})
     except Exception as e:
         return jsonify({'response': f'Error: {str(e)}'})
+    finally:
+        release()
+
+@bp.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the agent's reply and tool progress as Server-Sent Events"""
+    user_input = request.json.get('message', '')
+    session_id = request.json.get('session_id')
+    
+    release = acquire_chat_slot()
+    if release is None:
+        return busy_response()
+    try:
+        agent = get_agent()
+    except Exception as e:
+        # No response will carry the release, so free the slot here
+        release()
+        return jsonify({'response': f'Error: {str(e)}'}), 500
+    
+    def generate():
+        if not user_input.strip():
+            yield format_sse({'type': 'done', 'content': 'Please enter a message.'})
+            return
+        try:
+            for event in agent.run_conversation_stream(user_input, session_id):
+                yield format_sse(event)
+        except Exception as e:
+            yield format_sse({'type': 'error', 'message': str(e)})
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The server closes the response when the stream ends or the client goes away
+    response.call_on_close(release)
+    return response
+
+@bp.route('/api/session', methods=['POST'])
+def open_session():
+    """Called when a chat page opens so the agent can prefetch project context"""
+    session_id = (request.json or {}).get('session_id')
+    try:
+        prefetching = get_agent().open_session(session_id)
+    except Exception as e:
+        return jsonify({'prefetching': False, 'error': str(e)})
+    return jsonify({'prefetching': prefetching}), 202 if prefetching else 200
+
+@bp.route('/api/jobs')
+def list_jobs():
+    """List recent background jobs, optionally only those of one chat session"""
+    jobs = get_agent().job_queue.recent(request.args.get('session_id'))
+    return jsonify({'jobs': [public_job(job) for job in jobs]})
+
+@bp.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Return the status, progress and result of a background job"""
+    job = get_agent().job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return jsonify(public_job(job))
+
+@bp.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream a background job's progress as Server-Sent Events until it finishes"""
+    job_queue = get_agent().job_queue
+    
+    def generate():
+        since = 0.0
+        while True:
+            job = job_queue.wait_for_update(job_id, since)
+            if job is None:
+                yield format_sse({'type': 'error', 'message': f'Job {job_id} not found'})
+                return
+            if job['updated_at'] > since:
+                since = job['updated_at']
+                yield format_sse(dict(public_job(job), type='job'))
+                if job['status'] in FINISHED_STATUSES:
+                    return
+            else:
+                # Keep proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def public_job(job):
+    """Shape a job for API clients, decoding its JSON result"""
+    job = dict(job)
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+@bp.route('/api/ready')
+def ready():
+    """Report whether Taiga and Azure OpenAI are ready; 503 while starting"""
+    state = get_agent().readiness()
+    return jsonify(state), 200 if state['status'] == 'ready' else 503
+
+@bp.route('/metrics')
+def metrics():
+    """Expose latency and token usage metrics in Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def format_sse(event):
+    """Encode an agent event as a Server-Sent Events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+app = create_app()
 
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static', exist_ok=True)
     
+    # Start warming up the agent while the server binds
+    with app.app_context():
+        get_agent()
+    
     # Run the Flask application
     print("🚀 Starting Taiga AI Agent Chatbot...")
     print("📊 Open http://127.0.0.1:5000 in your browser")
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Make app.py importable when the server is started from the repository root
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, get_agent
+
+# Entry point for production WSGI servers, e.g.:
+#   gunicorn --chdir frontend --workers 1 --threads 32 wsgi:app
+app = create_app()
+
+# Start connecting to Taiga and Azure OpenAI before the first request arrives
+with app.app_context():
+    get_agent()
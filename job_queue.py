@@ -0,0 +1,263 @@
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from metrics import REGISTRY
+from tool_registry import result_status
+
+REGISTRY.define("jobs_total", "counter", "Background jobs finished, by kind and status")
+REGISTRY.define("job_duration_seconds", "histogram", "Run time of background jobs")
+
+# Terminal job states; anything else is still queued or running
+FINISHED_STATUSES = ("succeeded", "failed")
+
+class JobQueue:
+    """SQLite-backed queue of background jobs run by an in-process worker pool"""
+
+    def __init__(self, path: Optional[str] = None, workers: Optional[int] = None,
+                 poll_interval: float = 2.0) -> None:
+        """
+        Args:
+            path: SQLite database file (defaults to JOB_QUEUE_PATH or .jobs.sqlite3)
+            workers: Worker threads (defaults to JOB_WORKERS or 2)
+            poll_interval: Seconds between checks for jobs queued by other processes
+        """
+        self.path = path or os.getenv("JOB_QUEUE_PATH", ".jobs.sqlite3")
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._handlers = {}
+        self._pending = queue.Queue()
+        self._changed = threading.Condition()
+        self._threads = []
+        self._stopping = threading.Event()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, session_id TEXT, status TEXT NOT NULL, "
+                "payload TEXT NOT NULL, progress TEXT, result TEXT, error TEXT, owner TEXT, "
+                "delivered INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, delivered)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connection for one transaction, closed afterwards"""
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], Callable[..., None]], str]) -> None:
+        """
+        Register the function that runs jobs of a kind
+
+        The handler receives the job payload and a progress(**fields)
+        callback, and returns the job result as a JSON string.
+        """
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        """Start the worker threads, failing jobs orphaned by a dead process"""
+        if self._threads:
+            return
+        self._recover_orphans()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stopping.set()
+        for _ in self._threads:
+            self._pending.put(None)
+
+    def submit(self, kind: str, payload: Dict[str, Any], session_id: Optional[str] = None) -> str:
+        """
+        Queue a job and return its id immediately
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serializable handler arguments
+            session_id: Chat session to report the result to
+
+        Returns:
+            Job id
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, session_id, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, session_id, json.dumps(payload), now, now)
+            )
+        self._pending.put(job_id)
+        self._notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job as a dict, or None if it does not exist"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def recent(self, session_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return the most recent jobs, optionally only those of one session"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            if session_id:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE session_id = ? ORDER BY created_at DESC LIMIT ?",
+                    (session_id, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def undelivered(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return finished jobs of a session whose results the agent has not seen yet"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE session_id = ? AND delivered = 0 AND status IN (?, ?) "
+                "ORDER BY finished_at",
+                (session_id, *FINISHED_STATUSES)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def mark_delivered(self, job_ids: List[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany("UPDATE jobs SET delivered = 1 WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def wait_for_update(self, job_id: str, since: float, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """
+        Block until a job changes after the given updated_at timestamp
+
+        Returns:
+            The job (possibly unchanged when the timeout expires), or None if unknown
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["updated_at"] > since or remaining <= 0:
+                return job
+            # Updates from this process wake us early; other processes are polled
+            with self._changed:
+                self._changed.wait(min(remaining, 1.0))
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job_id = self._pending.get(timeout=self.poll_interval)
+            except queue.Empty:
+                job_id = self._oldest_queued()
+            if job_id is None or not self._claim(job_id):
+                continue
+            self._run(job_id)
+
+    def _oldest_queued(self) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def _claim(self, job_id: str) -> bool:
+        """Atomically move a queued job to running; False if another worker got it"""
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, started_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (self.owner, now, now, job_id)
+            ).rowcount
+        return claimed == 1
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        handler = self._handlers.get(job["kind"])
+        started = time.perf_counter()
+        print(f"⏳ Running {job['kind']} job {job_id}")
+
+        status = "failed"
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind '{job['kind']}'")
+            result = handler(job["payload"], lambda **fields: self._set_progress(job_id, fields))
+            # Tools report failures in their JSON result rather than by raising
+            status = "failed" if result_status(result) == "error" else "succeeded"
+            self._finish(job_id, status, result=result)
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self._finish(job_id, status, error=str(e))
+
+        REGISTRY.observe("job_duration_seconds", time.perf_counter() - started, kind=job["kind"])
+        REGISTRY.inc("jobs_total", kind=job["kind"], status=status)
+
+    def _set_progress(self, job_id: str, fields: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(fields), time.time(), job_id)
+            )
+        self._notify()
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, now, now, job_id)
+            )
+        self._notify()
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def _recover_orphans(self) -> None:
+        """Fail running jobs whose process on this host is gone; they may have half-finished"""
+        host = socket.gethostname()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+            for job_id, owner in rows:
+                owner_host, _, pid = (owner or "").rpartition(":")
+                if owner_host == host and not _pid_alive(int(pid or 0)):
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                        ("Interrupted by a server restart", now, now, job_id)
+                    )
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        job["delivered"] = bool(job["delivered"])
+        return job
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+class LLMResponseCache:
+    """SQLite-backed cache of model completions with size-based LRU eviction"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None,
+                 enabled: Optional[bool] = None) -> None:
+        self.path = path or os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+        self.max_bytes = max_bytes or int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+        if enabled is None:
+            enabled = os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+        self.enabled = enabled
+
+        if self.enabled:
+            try:
+                with self._connect() as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS responses ("
+                        "key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL, "
+                        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            except Exception as e:
+                print(f"⚠️ LLM response cache disabled: {e}")
+                self.enabled = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """One transaction: commits on success, rolls back on error and always closes the connection"""
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    @staticmethod
+    def make_key(deployment: Optional[str], messages: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """Hash the deployment, prompt and sampling parameters of a request"""
+        payload = json.dumps(
+            {"deployment": deployment, "messages": messages, "params": params},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                return row[0]
+        except Exception as e:
+            print(f"⚠️ LLM response cache read failed: {e}")
+            return None
+
+    def set(self, key: str, content: str) -> None:
+        if not self.enabled:
+            return
+
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, content, len(content.encode("utf-8")), now, now)
+                )
+                self._evict(conn)
+        except Exception as e:
+            print(f"⚠️ LLM response cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the cache fits max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        expired = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", expired)
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
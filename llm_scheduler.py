@@ -0,0 +1,196 @@
+import os
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from metrics import REGISTRY
+
+REGISTRY.define("llm_scheduler_wait_seconds", "histogram", "Time LLM calls waited for requests/tokens-per-minute budget")
+
+class TokenBucket:
+    """Budget that refills continuously up to a per-minute capacity"""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (amount is capped at the capacity)"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+
+class RateLimitScheduler:
+    """
+    Paces Azure OpenAI calls to the deployment's requests-per-minute and
+    tokens-per-minute quotas
+
+    Each call reserves one request and its estimated tokens before it is
+    sent, waiting for the buckets to refill if needed. Once the response
+    reports its real usage, the difference is refunded or charged.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None) -> None:
+        """
+        Args:
+            requests_per_minute: Request quota (defaults to AZURE_OPENAI_RPM; 0 disables)
+            tokens_per_minute: Token quota (defaults to AZURE_OPENAI_TPM; 0 disables)
+        """
+        if requests_per_minute is None:
+            requests_per_minute = float(os.getenv("AZURE_OPENAI_RPM", "0"))
+        if tokens_per_minute is None:
+            tokens_per_minute = float(os.getenv("AZURE_OPENAI_TPM", "0"))
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    @staticmethod
+    def estimate_tokens(messages: Optional[List[Dict[str, Any]]], max_tokens: Optional[int] = None,
+                        tools: Optional[List[Dict[str, Any]]] = None) -> int:
+        """
+        Estimate the tokens a call counts against the quota
+
+        Azure charges the prompt plus max_tokens when admitting a request, so
+        both are included; the prompt is approximated at four characters per token.
+        """
+        characters = sum(len(str(message.get("content") or "")) for message in messages or [])
+        characters += sum(len(str(tool)) for tool in tools or [])
+        return characters // 4 + (max_tokens or 0)
+
+    def acquire(self, estimated_tokens: int, deadline: Optional[float] = None) -> Optional[int]:
+        """
+        Block until one request and estimated_tokens fit the budgets, then take them
+
+        Args:
+            estimated_tokens: Tokens to reserve
+            deadline: time.monotonic() value after which to give up
+
+        Returns:
+            Tokens reserved, to be passed to settle(), or None if the budget
+            would not be available before the deadline
+        """
+        started = time.monotonic()
+        wait = self._try_reserve(estimated_tokens)
+        while wait > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return None
+            time.sleep(wait)
+            wait = self._try_reserve(estimated_tokens)
+        if self.enabled:
+            REGISTRY.observe("llm_scheduler_wait_seconds", time.monotonic() - started)
+        return estimated_tokens
+
+    async def acquire_async(self, estimated_tokens: int, deadline: Optional[float] = None) -> Optional[int]:
+        """Same as acquire(), waiting without blocking the event loop"""
+        started = time.monotonic()
+        wait = self._try_reserve(estimated_tokens)
+        while wait > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return None
+            await asyncio.sleep(wait)
+            wait = self._try_reserve(estimated_tokens)
+        if self.enabled:
+            REGISTRY.observe("llm_scheduler_wait_seconds", time.monotonic() - started)
+        return estimated_tokens
+
+    def _try_reserve(self, estimated_tokens: int) -> float:
+        """Take the budget if it is available; otherwise return the seconds to wait"""
+        if not self.enabled:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            for bucket, amount in ((self.requests, 1), (self.tokens, estimated_tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= estimated_tokens
+            return 0.0
+
+    def settle(self, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """Correct the token bucket once a call reports its actual usage"""
+        if self.tokens is None or used_tokens is None:
+            return
+        with self._lock:
+            self.tokens.refill(time.monotonic())
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved_tokens - used_tokens)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps concurrent model calls with additive-increase/multiplicative-decrease
+
+    Every successful call raises the limit by about one per limit's worth of
+    calls; a throttled (429) call halves it. Other failures say nothing about
+    capacity and leave it unchanged. Only calls started after the
+    last decrease can trigger another one, so a burst of 429s caused by
+    one overload counts as a single signal.
+    """
+
+    def __init__(self, max_limit: Optional[int] = None, min_limit: int = 1) -> None:
+        """
+        Args:
+            max_limit: Upper bound on concurrent calls (defaults to AZURE_OPENAI_MAX_CONCURRENCY or 16)
+            min_limit: Lower bound the limit never drops below
+        """
+        self.max_limit = max_limit or int(os.getenv("AZURE_OPENAI_MAX_CONCURRENCY", "16"))
+        self.min_limit = min_limit
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline: Optional[float] = None) -> Optional[float]:
+        """
+        Wait for a free slot
+
+        Args:
+            deadline: time.monotonic() value after which to give up
+
+        Returns:
+            The time the slot was taken, to be passed to release(), or None
+            if the deadline passed before a slot was free
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, acquired_at: float, throttled: bool = False, succeeded: bool = True) -> None:
+        """
+        Free a slot, adapting the limit to how the call went
+
+        Args:
+            acquired_at: Value returned by acquire()
+            throttled: The call was rejected with a 429
+            succeeded: The call completed; failures other than throttling keep the limit as is
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if not throttled:
+                if succeeded:
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            elif acquired_at >= self._last_decrease:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+                self._last_decrease = time.monotonic()
+            self._condition.notify_all()
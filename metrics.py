@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Latency buckets in seconds, from fast cache hits to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class MetricsRegistry:
+    """In-process counters and histograms rendered in Prometheus text format"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._definitions = {}
+        self._counters = {}
+        self._histograms = {}
+        self._callbacks = {}
+
+    def define(self, name: str, metric_type: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Declare a metric with its type ("counter" or "histogram") and help text"""
+        self._definitions[name] = (metric_type, help_text, buckets)
+
+    def register_callback(self, name: str, metric_type: str, help_text: str, callback: Callable[[], float]) -> None:
+        """Expose a value computed at scrape time, such as cache counters"""
+        with self._lock:
+            self._callbacks[name] = (metric_type, help_text, callback)
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = (name, self._label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        buckets = self._definitions.get(name, ("histogram", "", DEFAULT_BUCKETS))[2]
+        key = (name, self._label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any):
+        """Observe the duration of the wrapped block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, buckets=list(value["buckets"])) for key, value in self._histograms.items()}
+            callbacks = dict(self._callbacks)
+
+        for name, (metric_type, help_text, buckets) in sorted(self._definitions.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{self._format_labels(labels)} {value}")
+            else:
+                for (metric, labels), histogram in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(buckets, histogram["buckets"]):
+                        lines.append(f"{name}_bucket{self._format_labels(labels + (('le', repr(float(bound))),))} {count}")
+                    lines.append(f"{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                    lines.append(f"{name}_sum{self._format_labels(labels)} {histogram['sum']}")
+                    lines.append(f"{name}_count{self._format_labels(labels)} {histogram['count']}")
+
+        for name, (metric_type, help_text, callback) in sorted(callbacks.items()):
+            try:
+                value = callback()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+
+REGISTRY.define("taiga_request_duration_seconds", "histogram", "Latency of Taiga API requests by endpoint")
+REGISTRY.define("tool_call_duration_seconds", "histogram", "Latency of agent tool calls")
+REGISTRY.define("llm_request_duration_seconds", "histogram", "Latency of Azure OpenAI chat completions")
+REGISTRY.define("llm_tokens_total", "counter", "Azure OpenAI tokens by kind (prompt, completion, cached)")
+REGISTRY.define(
+    "agent_loop_iterations", "histogram", "Model round trips per run_conversation",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+)
+
+
+def _resident_memory_bytes() -> float:
+    """Current resident set size, or the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+REGISTRY.register_callback(
+    "process_resident_memory_bytes", "gauge", "Resident memory of this process", _resident_memory_bytes
+)
+
+
+def record_llm_usage(usage: Optional[Any], source: str) -> None:
+    """Count prompt, completion and cached tokens from a response's usage block"""
+    if usage is None:
+        return
+    REGISTRY.inc("llm_tokens_total", usage.prompt_tokens or 0, source=source, kind="prompt")
+    REGISTRY.inc("llm_tokens_total", usage.completion_tokens or 0, source=source, kind="completion")
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details else None
+    if cached:
+        REGISTRY.inc("llm_tokens_total", cached, source=source, kind="cached")
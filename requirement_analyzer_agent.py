@@ -1,5 +1,9 @@
 import os
 import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from azure_ai_client import AzureAIClient
 from taigaApi.taiga_api import TaigaAPI
@@ -7,6 +11,14 @@ from taigaApi.epic_manager import EpicManager
 from taigaApi.user_story_manager import UserStoryManager
 from taigaApi.project_manager import ProjectManager
 from taigaApi.story_generator import StoryGenerator
+from taigaApi.backlog_planner import BacklogPlanner
+from taigaApi.mirror import TaigaMirror
+from taigaApi.duplicate_index import DuplicateIndex
+from conversation_memory import ConversationMemory, summarize_tool_result
+from context_prefetch import ContextPrefetcher
+from job_queue import JobQueue
+from metrics import REGISTRY
+from tool_registry import ToolRegistry, result_status
 import taiga_functions
 
 # Load environment variables
@@ -16,175 +28,347 @@ class RequirementAnalyzerAgent:
     """AI Agent for creating and managing Taiga project artifacts using Azure OpenAI"""
     
     def __init__(self):
-        """Initialize the Taiga AI Agent with Azure OpenAI and Taiga API clients"""
+        """
+        Initialize the Taiga AI Agent with Azure OpenAI and Taiga API clients
+        
+        No network calls happen here: the OpenAI client is built on first use
+        and Taiga authenticates on demand, or ahead of time via warm_up().
+        """
         # Initialize the Azure OpenAI client
         self.ai_client = AzureAIClient()
         
-        # Initialize the Taiga API client and authenticate
+        # Initialize the Taiga API client
         self.taiga_api = TaigaAPI()
-        if not self.taiga_api.authenticate():
-            print("❌ Failed to authenticate with Taiga API")
-            return
-            
+        
+        # Readiness of the backing services, updated by warm_up()
+        self._readiness = {"status": "starting", "taiga": False, "azure": False, "error": None}
+        self._readiness_lock = threading.Lock()
+        self._warm_up_thread = None
+        
         # Initialize Taiga managers
         self.epic_manager = EpicManager(self.taiga_api)
         self.user_story_manager = UserStoryManager(self.taiga_api)
         self.project_manager = ProjectManager(self.taiga_api)
         self.story_generator = StoryGenerator(self.taiga_api, self.ai_client)
+        self.backlog_planner = BacklogPlanner(self.taiga_api, self.ai_client)
+        
+        # Local copy of Taiga for search and fast listing; writes through the client mark it stale
+        self.mirror = TaigaMirror(self.taiga_api)
+        self.taiga_api.mirror = self.mirror
+        
+        # Project and epic overviews handed to the model so it can skip its first list calls
+        self.context_prefetcher = ContextPrefetcher(self.mirror)
         
-        # Load tools definition
-        self.tools = self._load_tools()
+        # Near-duplicate stories are skipped during breakdowns and flagged by create_user_story
+        self.taiga_api.duplicate_index = DuplicateIndex(self.taiga_api)
+        
+        # Slow tools hand their work to background jobs that outlive the request
+        self.job_queue = JobQueue()
+        self.job_queue.register("breakdown_epic", lambda payload, progress: taiga_functions.breakdown_epic(
+            self.story_generator, None, payload["epic_id"], payload["project_id"], background=False, progress=progress
+        ))
+        self.job_queue.register("breakdown_project", lambda payload, progress: taiga_functions.breakdown_project(
+            self.story_generator, None, payload["project_id"], background=False, progress=progress
+        ))
+        self.job_queue.register("plan_backlog", lambda payload, progress: taiga_functions.plan_backlog(
+            self.backlog_planner, None, payload["requirements"], payload["project_id"], background=False, progress=progress
+        ))
+        self.job_queue.start()
+        
+        # Bind every tool schema to its taiga_functions handler once
+        self.tool_registry = ToolRegistry.from_file(taiga_functions, {
+            "epic_manager": self.epic_manager,
+            "user_story_manager": self.user_story_manager,
+            "project_manager": self.project_manager,
+            "story_generator": self.story_generator,
+            "backlog_planner": self.backlog_planner,
+            "job_queue": self.job_queue,
+            "mirror": self.mirror,
+        })
+        self.tools = self.tool_registry.schemas
+        
+        # Conversation history per chat session
+        self.memory = ConversationMemory()
+        
+        # Bounded pool for parallel tool calls, shared by every concurrent chat
+        self.tool_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("AGENT_TOOL_WORKERS", "16")),
+            thread_name_prefix="tool-call"
+        )
         
         print("✅ Taiga AI Agent initialized for default project (ID: 1)")
     
-    def _load_tools(self):
-        """Load the tools definition from JSON file"""
-        try:
-            with open('taiga_tools.json', 'r') as file:
-                return json.load(file)
-        except Exception as e:
-            print(f"❌ Error loading tools definition: {e}")
-            return []
+    def warm_up(self, background=True):
+        """
+        Initialize the Azure OpenAI client and authenticate with Taiga
+        
+        Taiga authentication is retried with exponential backoff until it
+        succeeds, so the agent becomes ready once Taiga finishes booting.
+        If Taiga rejects the credentials, warm-up stops and readiness
+        reports "failed" with an invalid credentials error.
+        
+        Args:
+            background: Run on a daemon thread instead of blocking the caller
+        """
+        if not background:
+            self._warm_up()
+            return
+        
+        with self._readiness_lock:
+            if self._warm_up_thread and self._warm_up_thread.is_alive():
+                return
+            self._warm_up_thread = threading.Thread(target=self._warm_up, name="agent-warm-up", daemon=True)
+            self._warm_up_thread.start()
+    
+    def _warm_up(self):
+        azure_ready = self.ai_client.client is not None
+        self._update_readiness(azure=azure_ready)
+        
+        delay = 1.0
+        max_delay = float(os.getenv("AGENT_WARMUP_MAX_DELAY", "30"))
+        while not self.taiga_api.ensure_authenticated():
+            if self.taiga_api.credentials_rejected:
+                # Retrying cannot fix a wrong username or password
+                self._update_readiness(status="failed", error=f"Taiga rejected the credentials of user '{self.taiga_api.username}' (invalid credentials)")
+                return
+            self._update_readiness(error=f"Taiga not reachable at {self.taiga_api.api_url}, retrying in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        
+        self._update_readiness(taiga=True, error=None)
+        
+        # Fill the mirror ahead of the first search; later syncs are incremental
+        self.mirror.sync()
+    
+    def _update_readiness(self, **changes):
+        with self._readiness_lock:
+            self._readiness.update(changes)
+            if self._readiness["status"] == "failed":
+                # Set by warm-up when it gives up; only a restart with a new configuration helps
+                return
+            if self._readiness["taiga"] and self._readiness["azure"]:
+                self._readiness["status"] = "ready"
+            elif self._readiness["taiga"]:
+                # Taiga works but the model cannot be reached with this configuration
+                self._readiness["status"] = "degraded"
+            else:
+                self._readiness["status"] = "starting"
+    
+    def readiness(self):
+        """Return the current readiness state of the agent and its backends"""
+        with self._readiness_lock:
+            return dict(self._readiness)
+    
+    def open_session(self, session_id=None):
+        """
+        Get ready for a chat that is about to start
+        
+        Refreshes the Taiga mirror in the background so the first turn's
+        prefetched context is current without waiting on Taiga.
+        
+        Args:
+            session_id: Chat session being opened
+            
+        Returns:
+            Boolean indicating whether a refresh was started
+        """
+        if session_id and self.memory.get_history(session_id):
+            # A continued session already has its context
+            return False
+        return self.context_prefetcher.prefetch() is not None
     
-    def run_conversation(self, user_input):
+    def run_conversation(self, user_input, session_id=None):
         """
         Run a conversation with the AI model to process user input
         
         Args:
             user_input: User's message
+            session_id: Optional chat session whose history should be continued
             
         Returns:
             AI's response
         """
+        for event in self.run_conversation_stream(user_input, session_id):
+            if event["type"] == "done":
+                return event["content"]
+            if event["type"] == "error":
+                return f"Error: {event['message']}"
+    
+    def run_conversation_stream(self, user_input, session_id=None):
+        """
+        Run a conversation with the AI model, streaming progress as it happens
+        
+        Args:
+            user_input: User's message
+            session_id: Optional chat session whose history should be continued
+            
+        Yields:
+            Event dicts with a "type" of:
+            - "delta": a chunk of assistant text in "content"
+            - "tool_started" / "tool_finished": progress of each tool call,
+              the latter with "duration" in seconds and the result "status"
+            - "done": the final assistant reply in "content"
+            - "error": a failure described by "message"
+        """
         if not self.ai_client.client:
-            return "Error: Azure OpenAI client is not initialized properly."
+            yield {"type": "error", "message": "Azure OpenAI client is not initialized properly."}
+            return
+        
+        if not session_id:
+            yield from self._run_turn(user_input, None)
+            return
+        
+        # Requests for the same session take turns so their histories do not interleave
+        with self.memory.session_lock(session_id):
+            yield from self._run_turn(user_input, session_id)
+    
+    def _run_turn(self, user_input, session_id):
+        """Run one user turn; all state lives in locals except the saved history"""
+        history = self.memory.get_history(session_id) if session_id else []
+        context = self.context_prefetcher.context_message(user_input, history)
+        
+        job_messages, job_ids = self._finished_job_messages(session_id)
         
         # Initial message history with system message for formatting instructions
         messages = [
             {"role": "system", "content": "When responding with lists of items such as user stories or requirements, please format them properly for display in a web interface. Use markdown formatting where appropriate: use numbered lists for sequential items, use bold for important terms (especially in user stories like 'As a user'), and separate distinct sections with line breaks. When showing user stories, maintain the format '1. **As a [user type]**, I want to [action] so that [benefit].'"},
+            *history,
+            *job_messages,
+            *([context] if context else []),
             {"role": "user", "content": user_input}
         ]
         
         # Continue the conversation until all tool calls are processed
-        while True:
-            try:
-                response = self.ai_client.client.chat.completions.create(
-                    model=self.ai_client.deployment,
-                    messages=messages,
-                    tools=self.tools,
-                    tool_choice="auto",
-                )
-                
-                # Process the model's response
-                response_message = response.choices[0].message
-                messages.append(response_message)
-                
-                # Check if the model wants to call functions
-                if not response_message.tool_calls:
-                    # No more tool calls - return final response
-                    return response_message.content
+        iterations = 0
+        try:
+            while True:
+                iterations += 1
+                try:
+                    stream = self.ai_client.create_chat_completion(
+                        "agent",
+                        messages=messages,
+                        tools=self.tools,
+                        tool_choice="auto",
+                        stream=True,
+                    )
                     
-                # Process tool calls
-                for tool_call in response_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
+                    # Forward text as it arrives and assemble tool calls from their deltas
+                    content_parts = []
+                    tool_calls = {}
+                    for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if delta.content:
+                            content_parts.append(delta.content)
+                            yield {"type": "delta", "content": delta.content}
+                        for tool_call_delta in delta.tool_calls or []:
+                            tool_call = tool_calls.setdefault(tool_call_delta.index, {
+                                "id": None,
+                                "type": "function",
+                                "function": {"name": "", "arguments": ""}
+                            })
+                            if tool_call_delta.id:
+                                tool_call["id"] = tool_call_delta.id
+                            if tool_call_delta.function:
+                                tool_call["function"]["name"] += tool_call_delta.function.name or ""
+                                tool_call["function"]["arguments"] += tool_call_delta.function.arguments or ""
                     
-                    # Call the appropriate function
-                    function_response = None
-                    print(f"Calling function: {function_name} with args: {function_args}")
+                    content = "".join(content_parts)
+                    response_message = {"role": "assistant", "content": content or None}
+                    if tool_calls:
+                        response_message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+                    messages.append(response_message)
                     
-                    if function_name == "list_epics":
-                        function_response = taiga_functions.list_epics( 
-                            self.epic_manager,
-                            function_args.get("project_id")  
-                        )
-                    elif function_name == "create_epic":
-                        function_response = taiga_functions.create_epic(
-                            self.epic_manager,
-                            function_args.get("subject"),
-                            function_args.get("project_id"),
-                            function_args.get("description", ""),  # Default to empty string if not provided
-                            function_args.get("tags", [])  # Default to empty list if not provided
-                             
-                        )
-                    elif function_name == "update_epic":
-                        function_response = taiga_functions.update_epic(
-                            self.epic_manager,
-                            function_args.get("epic_id"),
-                            function_args.get("updates")
-                        )
-                    elif function_name == "list_user_stories":
-                        function_response = taiga_functions.list_user_stories(
-                            self.user_story_manager,
-                            function_args.get("epics_id")
-                        )
-                    elif function_name == "create_user_story":
-                        function_response = taiga_functions.create_user_story(
-                            self.user_story_manager,
-                            function_args.get("subject"),
-                            function_args.get("project_id") ,
-                            function_args.get("description", "")
-                            
-                        )
-                    elif function_name == "delete_epic":
-                        function_response = taiga_functions.delete_epic(
-                            self.epic_manager,
-                            function_args.get("epic_id")
-                        )
-                    elif function_name == "delete_project":
-                        function_response = taiga_functions.delete_project(
-                            self.project_manager,
-                            function_args.get("project_id")
-                        )
-                    elif function_name == "delete_user_story":
-                        function_response = taiga_functions.delete_user_story(
-                            self.user_story_manager,
-                            function_args.get("user_story_id")
-                        )
-                    # Project management functions
-                    elif function_name == "list_projects":
-                        function_response = taiga_functions.list_projects(
-                            self.project_manager
-                        )
-                    elif function_name == "get_project":
-                        function_response = taiga_functions.get_project(
-                            self.project_manager,
-                            function_args.get("project_id")
-                        )
-                    elif function_name == "create_project":
-                        function_response = taiga_functions.create_project(
-                            self.project_manager,
-                            function_args.get("name"),
-                            function_args.get("description", "")  # Default to empty string if not provided
-                        )
-                    # Story generation functions
-                    elif function_name == "breakdown_epic":
-                        function_response = taiga_functions.breakdown_epic(
-                            self.story_generator,
-                            function_args.get("epic_id"),  
-                            function_args.get("project_id")
-                        )
-                    elif function_name == "link_user_story_to_epic":
-                        function_response = taiga_functions.link_user_story_to_epic(
-                            self.user_story_manager,
-                            function_args.get("user_story_id"),
-                            function_args.get("epic_id")
-                        )
-                    # Add function response to messages
-                    messages.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": function_response
-                    })
-                
-            except Exception as e:
-                return f"Error: {str(e)}"
+                    # Check if the model wants to call functions
+                    if not tool_calls:
+                        # No more tool calls - remember the turn and return final response
+                        if session_id:
+                            self.memory.save(session_id, messages[1:])
+                            # Only now is the job report part of the history
+                            if job_ids:
+                                self.job_queue.mark_delivered(job_ids)
+                        yield {"type": "done", "content": content}
+                        return
+                    
+                    # Independent tool calls from one turn run concurrently, but their
+                    # results are appended in the order the model issued them
+                    futures = []
+                    for tool_call in response_message["tool_calls"]:
+                        yield {"type": "tool_started", "id": tool_call["id"], "name": tool_call["function"]["name"]}
+                        futures.append(self.tool_executor.submit(
+                            self._timed_tool_call,
+                            tool_call["function"]["name"],
+                            tool_call["function"]["arguments"],
+                            session_id
+                        ))
+                    
+                    tool_call_by_future = dict(zip(futures, response_message["tool_calls"]))
+                    for future in as_completed(futures):
+                        tool_call = tool_call_by_future[future]
+                        function_response, duration = future.result()
+                        event = {
+                            "type": "tool_finished",
+                            "id": tool_call["id"],
+                            "name": tool_call["function"]["name"],
+                            "duration": round(duration, 3),
+                            "status": result_status(function_response)
+                        }
+                        if event["status"] == "queued":
+                            # Lets the UI follow the background job's progress
+                            event["job_id"] = json.loads(function_response).get("job_id")
+                        yield event
+                    
+                    for tool_call, future in zip(response_message["tool_calls"], futures):
+                        messages.append({
+                            "tool_call_id": tool_call["id"],
+                            "role": "tool",
+                            "name": tool_call["function"]["name"],
+                            "content": future.result()[0]
+                        })
+                    
+                except Exception as e:
+                    yield {"type": "error", "message": str(e)}
+                    return
+        finally:
+            REGISTRY.observe("agent_loop_iterations", iterations)
+    
+    def _timed_tool_call(self, function_name, arguments, session_id=None):
+        """Execute a tool call and return its result with the elapsed seconds"""
+        started = time.perf_counter()
+        function_response = self.tool_registry.call(function_name, arguments, {"session_id": session_id})
+        return function_response, time.perf_counter() - started
+    
+    def _finished_job_messages(self, session_id):
+        """
+        Report background jobs that finished since the session's last turn
+        
+        Each result is handed to the model once, as a system message that
+        also becomes part of the session history. The caller marks the jobs
+        delivered once that history is saved, so a failed turn reports them again.
+        
+        Returns:
+            The messages to add and the IDs of the jobs they report
+        """
+        if not session_id:
+            return [], []
+        
+        jobs = self.job_queue.undelivered(session_id)
+        if not jobs:
+            return [], []
+        
+        reports = []
+        for job in jobs:
+            outcome = job["result"] or json.dumps({"status": "error", "message": job["error"]})
+            reports.append(f"Job {job['id']} ({job['kind']}, {json.dumps(job['payload'])}) {job['status']}: {summarize_tool_result(outcome, max_items=50)}")
+        message = {"role": "system", "content": "Background jobs finished since the last message:\n" + "\n".join(reports)}
+        return [message], [job["id"] for job in jobs]
     
     def start_interactive_session(self):
         """Start an interactive session with the AI agent"""
         print("\n🤖 Taiga AI Agent - Interactive Session")
         print("Type 'exit' or 'quit' to end the session\n")
+        session_id = str(uuid.uuid4())
         
         while True:
             user_input = input("\nYou: ")
@@ -193,11 +377,12 @@ class RequirementAnalyzerAgent:
                 print("\nExiting Taiga AI Agent. Goodbye!")
                 break
                 
-            response = self.run_conversation(user_input)
+            response = self.run_conversation(user_input, session_id)
             print(f"\nAI: {response}")
 
 
 if __name__ == "__main__":
     # Create and run the Taiga AI Agent
     agent = RequirementAnalyzerAgent()
+    agent.warm_up()
     agent.start_interactive_session()
\ No newline at end of file
@@ -0,0 +1,150 @@
+import json
+import os
+import re
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Token budgets for the results of list tools; anything else uses TOOL_RESULT_TOKENS
+TOOL_TOKEN_BUDGETS = {
+    "list_projects": 800,
+    "list_epics": 1000,
+    "list_user_stories": 1500,
+}
+
+# Characters of description kept per item in list results
+SUMMARY_CHARS = 160
+
+class _TextExtractor(HTMLParser):
+    """Collects the readable text of an HTML fragment"""
+
+    BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote"}
+    SKIP_TAGS = {"script", "style"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Any]) -> None:
+        if tag in self.SKIP_TAGS:
+            self._skipping += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+            if tag == "li":
+                self.parts.append("- ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.SKIP_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: Optional[str], max_chars: Optional[int] = None) -> str:
+    """
+    Convert Taiga's HTML (or plain/markdown text) to compact plain text
+
+    Args:
+        html: Description as returned by Taiga
+        max_chars: Truncate at a word boundary to about this many characters
+
+    Returns:
+        Text with one line per block and collapsed whitespace
+    """
+    if not html:
+        return ""
+
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+
+    lines = (re.sub(r"[^\S\n]+", " ", line).strip() for line in "".join(extractor.parts).split("\n"))
+    text = "\n".join(line for line in lines if line)
+
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0].rstrip(" ,.;:") + "…"
+    return text
+
+
+def project_fields(item: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Keep only the requested fields of a formatted item"""
+    return {field: item[field] for field in fields if field in item}
+
+
+def resolve_fields(requested: Optional[List[str]], available: Iterable[str], default: List[str]) -> List[str]:
+    """
+    Choose the fields to return for a list tool
+
+    Unknown field names are ignored and "id" is always included.
+    """
+    available = list(available)
+    if not requested:
+        return default
+    fields = [field for field in available if field in requested]
+    return fields if "id" in fields else ["id", *fields]
+
+
+def token_budget(tool_name: str) -> int:
+    """Return the token budget for a tool's result"""
+    default = int(os.getenv("TOOL_RESULT_TOKENS", "2000"))
+    return TOOL_TOKEN_BUDGETS.get(tool_name, default)
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count of a JSON value (about four characters per token)"""
+    return len(json.dumps(value)) // 4
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Turn a cursor from a previous page into an item offset"""
+    try:
+        return max(0, int(cursor)) if cursor else 0
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid cursor '{cursor}'; pass the next_cursor of a previous result")
+
+
+def shape_page(items: List[Any], key: str, tool_name: str, cursor: Optional[str] = None,
+               format_item: Callable[[Any], Dict[str, Any]] = dict, max_items: Optional[int] = None,
+               complete: bool = True) -> Dict[str, Any]:
+    """
+    Build a tool result holding as many items as fit the tool's token budget
+
+    Args:
+        items: All items in scope, in display order
+        key: Result key for the page of items (e.g. "projects")
+        tool_name: Tool whose budget applies
+        cursor: next_cursor from a previous page, or None for the first page
+        format_item: Projects a raw item to the dict sent to the model
+        max_items: Cap on the page size on top of the token budget
+        complete: False when items was cut short, so its length is not the total
+
+    Returns:
+        Dict with the page under key, "count", "total" (when known),
+        "more_available" and, when more items remain, "next_cursor"
+    """
+    offset = decode_cursor(cursor)
+    budget = token_budget(tool_name)
+
+    page = []
+    used = 0
+    for item in items[offset:]:
+        formatted = format_item(item)
+        cost = estimate_tokens(formatted)
+        # Always return at least one item so paging makes progress
+        if page and (used + cost > budget or len(page) == max_items):
+            break
+        page.append(formatted)
+        used += cost
+
+    next_offset = offset + len(page)
+    result = {key: page, "count": len(page)}
+    if complete:
+        result["total"] = len(items)
+    result["more_available"] = next_offset < len(items)
+    if result["more_available"]:
+        result["next_cursor"] = str(next_offset)
+    return result
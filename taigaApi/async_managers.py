@@ -0,0 +1,362 @@
+import asyncio
+from typing import List, Dict, Any
+from taigaApi.story_generator import STORY_RESPONSE_FORMAT, StoryGenerator
+
+class AsyncProjectManager:
+    def __init__(self, taiga_api):
+        self.taiga = taiga_api
+
+    async def create_project(self, name, description):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.taiga.api_url}/projects"
+
+            payload = {
+                "name": name,
+                "description": description
+            }
+
+            response = await self.taiga.request("POST", url, json=payload)
+            response.raise_for_status()
+            project = response.json()
+            print(f"✅ Created project '{name}'")
+            return project
+
+        except Exception as e:
+            print(f"❌ Failed to create project: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return None
+
+    async def get_projects(self):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.taiga.api_url}/projects"
+            response = await self.taiga.request("GET", url)
+            response.raise_for_status()
+            projects = response.json()
+            print(f"✅ Found {len(projects)} projects")
+            return projects
+
+        except Exception as e:
+            print(f"❌ Failed to get projects: {e}")
+            return None
+
+    async def get_project(self, project_id):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.taiga.api_url}/projects/{project_id}"
+            response = await self.taiga.request("GET", url)
+            response.raise_for_status()
+            project = response.json()
+            print(f"✅ Retrieved project '{project.get('name')}'")
+            return project
+
+        except Exception as e:
+            print(f"❌ Failed to get project details: {e}")
+            return None
+
+    async def delete_project(self, project_id):
+        if not await self.taiga.ensure_authenticated():
+            return False
+
+        try:
+            url = f"{self.taiga.api_url}/projects/{project_id}"
+            response = await self.taiga.request("DELETE", url)
+            response.raise_for_status()
+            print(f"✅ Deleted project with ID {project_id}")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to delete project: {e}")
+            return False
+
+
+class AsyncEpicManager:
+    def __init__(self, taiga_api):
+        self.taiga = taiga_api
+
+    async def get_epics(self, project_id):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            if project_id is None:
+                url = f"{self.taiga.api_url}/epics"
+            else:
+                url = f"{self.taiga.api_url}/epics?project={project_id}"
+            response = await self.taiga.request("GET", url)
+            response.raise_for_status()
+            epics = response.json()
+            print(f"✅ Found {len(epics)} epics for project ID {project_id}")
+            return epics
+
+        except Exception as e:
+            print(f"❌ Failed to get epics: {e}")
+            return None
+
+    async def get_epic(self, epic_id):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.taiga.api_url}/epics/{epic_id}"
+            response = await self.taiga.request("GET", url)
+            response.raise_for_status()
+            epic = response.json()
+            print(f"✅ Retrieved epic '{epic.get('subject')}'")
+            return epic
+
+        except Exception as e:
+            print(f"❌ Failed to get epic details: {e}")
+            return None
+
+    async def create_epic(self, project_id, subject, description=None, assigned_to=None, tags=None):
+        if not await self.taiga.ensure_authenticated():
+            return None
+        try:
+            url = f"{self.taiga.api_url}/epics"
+
+            payload = {
+                "project": project_id,
+                "subject": subject,
+                "description": description or "",
+                "tags": tags or []
+            }
+
+            if assigned_to:
+                payload["assigned_to"] = assigned_to
+
+            response = await self.taiga.request("POST", url, json=payload)
+            response.raise_for_status()
+            epic = response.json()
+            print(f"✅ Created epic '{subject}'")
+            return epic
+
+        except Exception as e:
+            print(f"❌ Failed to create epic: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return None
+
+    async def update_epic(self, epic_id, updates):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.taiga.api_url}/epics/{epic_id}"
+
+            response = await self.taiga.request("PATCH", url, json=updates)
+            response.raise_for_status()
+            epic = response.json()
+            print(f"✅ Updated epic '{epic.get('subject')}'")
+            return epic
+
+        except Exception as e:
+            print(f"❌ Failed to update epic: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return None
+
+    async def delete_epic(self, epic_id):
+        if not await self.taiga.ensure_authenticated():
+            return False
+
+        try:
+            url = f"{self.taiga.api_url}/epics/{epic_id}"
+            response = await self.taiga.request("DELETE", url)
+            response.raise_for_status()
+            print(f"✅ Deleted epic with ID {epic_id}")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to delete epic: {e}")
+            return False
+
+
+class AsyncUserStoryManager:
+    def __init__(self, taiga_api):
+        self.taiga = taiga_api
+
+    async def get_user_stories(self, epic_id=None):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.taiga.api_url}/userstories"
+            if epic_id is not None:
+                url = f"{self.taiga.api_url}/epics/{epic_id}/related_userstories"
+            response = await self.taiga.request("GET", url)
+            response.raise_for_status()
+            return response.json()
+
+        except Exception as e:
+            print(f"❌ Failed to get user stories: {e}")
+            return None
+
+    async def create_user_story(self, subject, project_id, description=None,
+                                assigned_to=None, tags=None, status=None, points=None):
+        if not await self.taiga.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.taiga.api_url}/userstories"
+
+            payload = {
+                "project": project_id,
+                "subject": subject,
+                "description": description or ""
+            }
+
+            if assigned_to:
+                payload["assigned_to"] = assigned_to
+
+            if tags:
+                payload["tags"] = tags
+
+            if status:
+                payload["status"] = status
+
+            if points:
+                payload["points"] = points
+
+            response = await self.taiga.request("POST", url, json=payload)
+            response.raise_for_status()
+            return response.json()
+
+        except Exception as e:
+            print(f"❌ Failed to create user story: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return None
+
+    async def link_user_story_to_epic(self, user_story_id, epic_id):
+        if not await self.taiga.ensure_authenticated():
+            return False
+
+        try:
+            url = f"{self.taiga.api_url}/epics/{epic_id}/related_userstories"
+
+            payload = {
+                "epic": epic_id,
+                "user_story": user_story_id
+            }
+
+            response = await self.taiga.request("POST", url, json=payload)
+            response.raise_for_status()
+            return True
+
+        except Exception as e:
+            print(f"❌ Failed to link user story to epic: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return False
+
+    async def delete_user_story(self, user_story_id):
+        if not await self.taiga.ensure_authenticated():
+            return False
+
+        try:
+            url = f"{self.taiga.api_url}/userstories/{user_story_id}"
+            response = await self.taiga.request("DELETE", url)
+            response.raise_for_status()
+            print(f"✅ Deleted user story with ID {user_story_id}")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to delete user story: {e}")
+            return False
+
+
+class AsyncStoryGenerator(StoryGenerator):
+    """Async variant of StoryGenerator reusing its prompt and parsing helpers"""
+
+    async def breakdown_epic_into_stories(self, project_id: Any, epic_id: Any, use_cache: bool = True) -> List[Dict[str, Any]]:
+        epic_manager = AsyncEpicManager(self.taiga)
+        user_story_manager = AsyncUserStoryManager(self.taiga)
+
+        # Get the epic details
+        epic = await epic_manager.get_epic(epic_id)
+        if not epic:
+            print(f"❌ Failed to retrieve epic with ID {epic_id}")
+            return []
+
+        epic_subject = epic.get("subject", "")
+        epic_description = epic.get("description", "")
+
+        print(f"🔍 Analyzing epic: '{epic_subject}'")
+
+        if not self.ai_client.client:
+            print("❌ Azure OpenAI client is not initialized")
+            return []
+
+        try:
+            messages = self._build_messages(epic_subject, epic_description)
+            cache = self.ai_client.response_cache
+            cache_key = cache.make_key(self.ai_client.deployment, messages, self.cache_params())
+
+            content = cache.get(cache_key) if use_cache else None
+            if content is None:
+                content = await self._generate_stories(messages)
+
+            user_stories_data = self._parse_stories(content)
+            if user_stories_data is None:
+                return []
+
+            cache.set(cache_key, content)
+
+            async def create_and_link(story_data):
+                subject = story_data.get("subject")
+                result = {"subject": subject, "story": None, "linked": False, "error": None}
+                story = await user_story_manager.create_user_story(
+                    project_id=project_id,
+                    subject=subject,
+                    description=story_data.get("description")
+                )
+                if not story:
+                    result["error"] = "Failed to create user story"
+                    return result
+
+                result["story"] = story
+                result["linked"] = await user_story_manager.link_user_story_to_epic(story.get("id"), epic_id)
+                if not result["linked"]:
+                    result["error"] = "Failed to link to epic"
+                return result
+
+            # Stories are independent of each other, so create them concurrently
+            results = await asyncio.gather(*(create_and_link(data) for data in user_stories_data))
+            for result in results:
+                if result["error"]:
+                    print(f"⚠️ User story '{result['subject']}': {result['error']}")
+
+            created_count = len([result for result in results if result["story"]])
+            print(f"✅ Created {created_count} user stories for epic '{epic_subject}'")
+            return list(results)
+
+        except Exception as e:
+            print(f"❌ Error generating stories from epic: {e}")
+            return []
+
+    async def _generate_stories(self, messages: List[Dict[str, str]]) -> str:
+        """Request the stories, falling back to plain JSON mode if structured output is rejected"""
+        try:
+            response = await self.ai_client.create_chat_completion_async(
+                "story_generator",
+                messages=messages,
+                response_format=STORY_RESPONSE_FORMAT,
+                **self.generation_params
+            )
+        except Exception as e:
+            if getattr(e, "status_code", None) != 400:
+                raise
+            # Older API versions reject json_schema; the prompt still asks for JSON
+            print(f"⚠️ Structured output rejected ({e}), falling back to plain JSON")
+            response = await self.ai_client.create_chat_completion_async(
+                "story_generator",
+                messages=messages,
+                **self.generation_params
+            )
+        return response.choices[0].message.content
@@ -0,0 +1,184 @@
+import os
+import time
+import asyncio
+import httpx
+from dotenv import load_dotenv
+from taigaApi.taiga_api import TaigaAPI
+
+# Load environment variables
+load_dotenv()
+
+class AsyncTaigaAPI:
+    """Asyncio client for the Taiga API sharing one connection pool"""
+
+    def __init__(self, username=None, password=None):
+        self.api_url = os.getenv("TAIGA_API_URL", "http://localhost:8080/api/v1")
+
+        self.username = username or os.getenv("TAIGA_USERNAME", "admin")
+        self.password = password or os.getenv("TAIGA_PASSWORD", "adminpassword")
+        self.auth_token = None
+        self.refresh_token = None
+        self.user_id = None
+        self.token_expires_at = None
+
+        # Only one coroutine (re)authenticates at a time; the others reuse its token
+        self._auth_lock = asyncio.Lock()
+        self.refresh_skew = float(os.getenv("TAIGA_TOKEN_REFRESH_SKEW", "60"))
+
+        # Same pool settings as the synchronous TaigaAPI client
+        self.pool_size = int(os.getenv("TAIGA_POOL_SIZE", "10"))
+        self.timeout = float(os.getenv("TAIGA_TIMEOUT", "30"))
+        self.max_retries = int(os.getenv("TAIGA_MAX_RETRIES", "3"))
+        # AsyncClient ignores its own limits when given a transport, so the pool is bounded here
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            transport=httpx.AsyncHTTPTransport(
+                retries=self.max_retries,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                )
+            )
+        )
+
+        print(f"✅ Async Taiga API client initialized with URL: {self.api_url}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Release pooled connections"""
+        await self.client.aclose()
+
+    async def request(self, method, url, **kwargs):
+        """
+        Send a request through the shared connection pool
+
+        Args:
+            method: HTTP verb
+            url: Absolute API URL
+            **kwargs: Extra arguments passed to httpx (json, params, ...)
+
+        Returns:
+            httpx.Response
+        """
+        extra_headers = kwargs.pop("headers", None) or {}
+        token = self.auth_token
+        response = await self.client.request(method, url, headers={**self.get_headers(), **extra_headers}, **kwargs)
+
+        # Same replay-once-after-refresh behaviour as TaigaAPI.request
+        if response.status_code == 401 and token and await self._reauthenticate(token):
+            response = await self.client.request(method, url, headers={**self.get_headers(), **extra_headers}, **kwargs)
+        return response
+
+    async def ensure_authenticated(self):
+        """
+        Make sure a usable token is present, refreshing it shortly before it expires
+
+        Returns:
+            Boolean indicating whether a token is available
+        """
+        token = self.auth_token
+        if token and not self._token_expiring():
+            return True
+        return await self._reauthenticate(token)
+
+    async def _reauthenticate(self, stale_token):
+        """Replace stale_token with a fresh one, single-flight across coroutines"""
+        async with self._auth_lock:
+            if self.auth_token and self.auth_token != stale_token and not self._token_expiring():
+                return True
+            if self.auth_token:
+                return await self.refresh_authentication()
+            return await self.authenticate()
+
+    def _token_expiring(self):
+        return self.token_expires_at is not None and time.time() >= self.token_expires_at - self.refresh_skew
+
+    def _set_tokens(self, auth_token, refresh_token):
+        self.auth_token = auth_token
+        self.refresh_token = refresh_token
+        self.token_expires_at = TaigaAPI._token_expiry(auth_token)
+
+    async def authenticate(self):
+        try:
+            url = f"{self.api_url}/auth"
+
+            payload = {
+                "type": "normal",
+                "username": self.username,
+                "password": self.password
+            }
+
+            response = await self.client.post(url, json=payload)
+            response.raise_for_status()
+
+            auth_data = response.json()
+            self._set_tokens(auth_data.get("auth_token"), auth_data.get("refresh"))
+            self.user_id = auth_data.get("id")
+
+            if self.auth_token:
+                print(f"✅ Authenticated as {self.username}")
+                return True
+            else:
+                print("❌ Authentication failed: No auth token received")
+                return False
+
+        except Exception as e:
+            print(f"❌ Authentication failed: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return False
+
+    async def refresh_authentication(self):
+        if not self.refresh_token:
+            return await self.authenticate()
+
+        try:
+            url = f"{self.api_url}/auth/refresh"
+
+            payload = {
+                "refresh": self.refresh_token
+            }
+
+            response = await self.client.post(url, json=payload)
+            response.raise_for_status()
+
+            auth_data = response.json()
+            self._set_tokens(auth_data.get("auth_token"), auth_data.get("refresh"))
+
+            if self.auth_token:
+                print("✅ Authentication token refreshed")
+                return True
+            else:
+                print("❌ Token refresh failed: No auth token received")
+                return False
+
+        except Exception as e:
+            print(f"❌ Token refresh failed: {e}")
+            return await self.authenticate()
+
+    def get_headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.auth_token:
+            headers["Authorization"] = f"Bearer {self.auth_token}"
+        return headers
+
+    async def get_user_info(self):
+        if not await self.ensure_authenticated():
+            return None
+
+        try:
+            url = f"{self.api_url}/users/me"
+            response = await self.request("GET", url)
+            response.raise_for_status()
+            user_data = response.json()
+            print(f"✅ Retrieved user info for {user_data.get('username')}")
+            return user_data
+
+        except Exception as e:
+            print(f"❌ Failed to get user info: {e}")
+            return None
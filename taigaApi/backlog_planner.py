@@ -0,0 +1,321 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import json
+import threading
+from taigaApi.json_stream import JSONArrayStreamParser
+from taigaApi.task_graph import TaskGraph
+
+_STORY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "subject": {"type": "string"},
+        "description": {"type": "string"}
+    },
+    "required": ["subject", "description"],
+    "additionalProperties": False
+}
+
+# Structured output for a whole backlog; "project" comes first so it can be
+# created while the epics are still being generated
+BACKLOG_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "backlog_plan",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "project": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "description": {"type": "string"}
+                    },
+                    "required": ["name", "description"],
+                    "additionalProperties": False
+                },
+                "epics": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "subject": {"type": "string"},
+                            "description": {"type": "string"},
+                            "stories": {"type": "array", "items": _STORY_SCHEMA}
+                        },
+                        "required": ["subject", "description", "stories"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["project", "epics"],
+            "additionalProperties": False
+        }
+    }
+}
+
+class BacklogPlanner:
+    """
+    Turns a requirements text into a Taiga project, epics and user stories
+
+    One model call produces the whole tree as structured output. While it
+    streams, every object is handed to a TaskGraph that only waits where
+    Taiga needs an ID: epics and stories wait for the project, and each
+    epic link waits for its epic and its story.
+    """
+
+    # Sampling parameters for planning; part of the response cache key
+    generation_params = {"temperature": 0.4, "max_tokens": 8000}
+
+    def __init__(self, taiga_api, azure_ai_client):
+        self.taiga = taiga_api
+        self.ai_client = azure_ai_client
+
+    def plan_backlog(self, requirements: str, project_id: Optional[Any] = None, use_cache: bool = True,
+                     progress: Optional[Callable[..., None]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Plan a backlog with AI and create it in Taiga
+
+        Args:
+            requirements: Free-text requirements
+            project_id: Existing project to add the epics to; a new project is created when None
+            use_cache: Reuse a stored plan for identical requirements
+            progress: Optional callback receiving stage updates as keyword arguments
+
+        Returns:
+            Dict with "project", "epics" (each with its "stories"), "failures"
+            and "skipped_duplicates", or None if no plan could be generated
+        """
+        from taigaApi.epic_manager import EpicManager
+        from taigaApi.project_manager import ProjectManager
+        from taigaApi.user_story_manager import UserStoryManager
+
+        if not self.ai_client.client:
+            print("❌ Azure OpenAI client is not initialized")
+            return None
+
+        project_manager = ProjectManager(self.taiga)
+        epic_manager = EpicManager(self.taiga)
+        user_story_manager = UserStoryManager(self.taiga)
+        report = progress or (lambda **fields: None)
+
+        counts = {"done": 0, "total": 0}
+        counts_lock = threading.Lock()
+
+        def on_done(key, task):
+            with counts_lock:
+                counts["done"] += 1
+                report(stage="creating", completed=counts["done"], total=counts["total"])
+
+        graph = TaskGraph(self.taiga.pool_size, on_done)
+
+        def add_task(key, function, depends_on=()):
+            with counts_lock:
+                counts["total"] += 1
+            graph.add(key, function, depends_on)
+
+        if project_id is not None:
+            project_id = int(project_id)
+            add_task("project", lambda: project_manager.get_project(project_id))
+
+        messages = self._build_messages(requirements)
+        cache = self.ai_client.response_cache
+        cache_key = cache.make_key(self.ai_client.deployment, messages, self.cache_params())
+
+        plan = {"project": None, "epics": []}
+        skipped = []
+        accepted = []
+        content_parts = []
+        cached = None
+        stream_error = None
+        report(stage="planning")
+
+        try:
+            cached = cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                print("♻️ Reusing cached backlog plan")
+            chunks = iter([cached]) if cached is not None else self._stream_plan(messages)
+            parser = JSONArrayStreamParser()
+
+            for text in chunks:
+                content_parts.append(text)
+                epics = parser.feed(text)
+
+                if epics and project_id is None and plan["project"] is None:
+                    # The project object is complete once the first epic is
+                    plan["project"] = self._parse_project("".join(content_parts)) or {}
+                    fields = plan["project"]
+                    add_task("project", lambda: project_manager.create_project(
+                        fields.get("name") or "New project", fields.get("description") or ""
+                    ))
+
+                for epic_data in epics:
+                    self._schedule_epic(len(plan["epics"]), epic_data, project_id, add_task,
+                                        epic_manager, user_story_manager, accepted, skipped)
+                    plan["epics"].append(epic_data)
+        except Exception as e:
+            # Whatever was scheduled before the failure still gets created
+            stream_error = e
+            print(f"❌ Backlog planning stopped early: {e}")
+
+        if project_id is None and plan["project"] is None and plan["epics"]:
+            plan["project"] = self._parse_project("".join(content_parts)) or {}
+
+        results = graph.join()
+        if not plan["epics"]:
+            print(f"❌ AI response did not contain a backlog plan: {''.join(content_parts)[:500]}")
+            return None
+        if stream_error is None and cached is None:
+            cache.set(cache_key, "".join(content_parts))
+
+        summary = self._summarize(plan, results, skipped)
+        if stream_error is not None:
+            summary["failures"].append({"item": "plan", "error": f"Generation stopped early: {stream_error}"})
+        story_count = sum(len(epic["stories"]) for epic in summary["epics"])
+        print(f"✅ Planned {len(summary['epics'])} epics and {story_count} user stories"
+              + (f" in project '{summary['project']['name']}'" if summary["project"] else ""))
+        return summary
+
+    def cache_params(self) -> Dict[str, Any]:
+        """Request parameters that, with the prompt, identify a cached plan"""
+        return {**self.generation_params, "response_format": BACKLOG_RESPONSE_FORMAT}
+
+    def _schedule_epic(self, index, epic_data, project_id, add_task, epic_manager, user_story_manager,
+                       accepted, skipped):
+        """Add the tasks that create one epic, its stories and their links"""
+        epic_key = f"epic:{index}"
+        add_task(epic_key, lambda project: epic_manager.create_epic(
+            project.get("id"), epic_data.get("subject"), epic_data.get("description")
+        ), ["project"])
+
+        for story_index, story_data in enumerate(epic_data.get("stories") or []):
+            duplicate = self._find_duplicate(project_id, story_data, accepted)
+            if duplicate:
+                skipped.append({"subject": story_data.get("subject"), "epic": epic_data.get("subject"),
+                                "duplicate_of": duplicate})
+                continue
+
+            story_key = f"story:{index}:{story_index}"
+            # Stories only need the project; linking is what waits for the epic
+            add_task(story_key, lambda project, data=story_data: user_story_manager.create_user_story(
+                subject=data.get("subject"),
+                project_id=project.get("id"),
+                description=data.get("description")
+            ), ["project"])
+            add_task(f"link:{index}:{story_index}", lambda epic, story: user_story_manager.link_user_story_to_epic(
+                story.get("id"), epic.get("id")
+            ) or None, [epic_key, story_key])
+
+    def _find_duplicate(self, project_id, story_data, accepted):
+        """Match against the stories accepted so far, and an existing project's stories"""
+        index = self.taiga.duplicate_index
+        if index is None:
+            return None
+        try:
+            return index.find(project_id, story_data.get("subject"), story_data.get("description"), accepted)
+        except Exception as e:
+            print(f"⚠️ Duplicate check failed, creating the story anyway: {e}")
+            return None
+
+    def _summarize(self, plan, results, skipped):
+        """Build the created project/epic/story tree and the list of failures"""
+        failures = [
+            {"item": key, "error": state["error"]}
+            for key, state in results.items() if state["status"] != "succeeded"
+        ]
+
+        project_state = results.get("project") or {}
+        project = project_state.get("result")
+        summary = {
+            "project": {"id": project.get("id"), "name": project.get("name")} if project else None,
+            "epics": [],
+            "failures": failures,
+            "skipped_duplicates": skipped
+        }
+
+        for index, epic_data in enumerate(plan["epics"]):
+            epic = (results.get(f"epic:{index}") or {}).get("result")
+            stories = []
+            for story_index, story_data in enumerate(epic_data.get("stories") or []):
+                story = (results.get(f"story:{index}:{story_index}") or {}).get("result")
+                if story:
+                    linked = (results.get(f"link:{index}:{story_index}") or {}).get("status") == "succeeded"
+                    stories.append({"id": story.get("id"), "subject": story.get("subject"), "linked": linked})
+            summary["epics"].append({
+                "id": epic.get("id") if epic else None,
+                "subject": epic_data.get("subject"),
+                "stories": stories
+            })
+        return summary
+
+    def _stream_plan(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Stream the plan's text, falling back to plain JSON mode if structured output is rejected"""
+        try:
+            stream = self.ai_client.create_chat_completion(
+                "backlog_planner",
+                messages=messages,
+                response_format=BACKLOG_RESPONSE_FORMAT,
+                stream=True,
+                **self.generation_params
+            )
+        except Exception as e:
+            if getattr(e, "status_code", None) != 400:
+                raise
+            print(f"⚠️ Structured output rejected ({e}), falling back to plain JSON")
+            stream = self.ai_client.create_chat_completion(
+                "backlog_planner",
+                messages=messages,
+                stream=True,
+                **self.generation_params
+            )
+
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    @staticmethod
+    def _parse_project(text: str) -> Optional[Dict[str, Any]]:
+        """Decode the "project" object from the start of a (possibly partial) plan"""
+        start = text.find('"project"')
+        if start < 0:
+            return None
+        try:
+            value = text[text.index(":", start) + 1:].lstrip()
+            project, _ = json.JSONDecoder().raw_decode(value)
+            return project if isinstance(project, dict) else None
+        except ValueError:
+            return None
+
+    def _build_messages(self, requirements: str) -> List[Dict[str, str]]:
+        """Build the chat messages asking the model for a complete backlog"""
+        system_prompt = """
+        You are an expert product manager who turns requirements into a complete Taiga backlog.
+        Define one project, split the requirements into epics that each cover a coherent feature area,
+        and break every epic into user stories.
+        Each user story should follow the format: "As a [user type], I want [action] so that [benefit]",
+        with a description covering implementation details and acceptance criteria.
+        Do not repeat the same story under different epics.
+        """
+
+        user_prompt = f"""
+        Requirements:
+        {requirements}
+
+        Return your response as a JSON object with the following structure:
+        {{
+            "project": {{"name": "Project name", "description": "What the project is for"}},
+            "epics": [
+                {{
+                    "subject": "Epic title",
+                    "description": "What the epic covers",
+                    "stories": [
+                        {{"subject": "Story title in user story format", "description": "Details and acceptance criteria"}}
+                    ]
+                }}
+            ]
+        }}
+        """
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
@@ -0,0 +1,287 @@
+import os
+import re
+import time
+import zlib
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+from result_shaping import html_to_text
+
+# Words too common in user stories to tell two of them apart
+STOP_WORDS = frozenset(
+    "a an and are as at be by can for from i in is it of on or so that the this to want we with "
+    "user users should will my our".split()
+)
+
+class _ProjectVectors:
+    """
+    Sparse hashed term counts of one project's stories
+
+    Each story keeps only its non-zero features. For scoring, the rows are
+    also laid out flat with their TF-IDF weights already normalized. The
+    IDF is a snapshot, refreshed once the number of stories drifts a tenth
+    from when it was taken; in between, adding a story only weights that
+    story's row, and only a refresh or a removal rebuilds the flat layout.
+    """
+
+    IDF_DRIFT = 0.1
+
+    def __init__(self, dimensions: int) -> None:
+        self.doc_freq = np.zeros(dimensions, dtype=np.float32)
+        self.ids = []
+        self.subjects = []
+        self.rows = []
+        self.positions = {}
+        self._idf = None
+        self._idf_count = 0
+        # Flat weighted entries: feature, weight and owning row; None when they need a rebuild
+        self._used = None
+        self._features = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._owners = np.zeros(0, dtype=np.int32)
+
+    def add(self, story_id: Any, subject: str, row: np.ndarray) -> None:
+        self.remove(story_id)
+        features = np.flatnonzero(row).astype(np.int32)
+        counts = row[features]
+        self.doc_freq[features] += 1
+        self.positions[story_id] = len(self.ids)
+        self.ids.append(story_id)
+        self.subjects.append(subject)
+        self.rows.append((features, counts))
+        if self._used is not None:
+            self._append(len(self.rows) - 1, features, counts)
+
+    def remove(self, story_id: Any) -> bool:
+        index = self.positions.pop(story_id, None)
+        if index is None:
+            return False
+        self.doc_freq[self.rows[index][0]] -= 1
+        # Move the last story into the gap so rows stay contiguous
+        last = len(self.ids) - 1
+        self.ids[index], self.subjects[index], self.rows[index] = self.ids[last], self.subjects[last], self.rows[last]
+        if index != last:
+            self.positions[self.ids[index]] = index
+        self.ids.pop()
+        self.subjects.pop()
+        self.rows.pop()
+        self._used = None
+        return True
+
+    def idf(self) -> np.ndarray:
+        """The current IDF snapshot, refreshed when the story count has drifted"""
+        count = len(self.ids)
+        if self._idf is None or abs(count - self._idf_count) > self.IDF_DRIFT * self._idf_count:
+            self._idf = np.log((1.0 + count) / (1.0 + self.doc_freq)) + 1.0
+            self._idf_count = count
+            self._used = None
+        return self._idf
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every story to a query normalized with idf()"""
+        self.idf()
+        if self._used is None:
+            self._rebuild()
+        used = self._used
+        return np.bincount(
+            self._owners[:used],
+            weights=self._weights[:used] * query[self._features[:used]],
+            minlength=len(self.ids)
+        )
+
+    def _rebuild(self) -> None:
+        self._used = 0
+        for index, (features, counts) in enumerate(self.rows):
+            self._append(index, features, counts)
+
+    def _append(self, index: int, features: np.ndarray, counts: np.ndarray) -> None:
+        """Weight and normalize one row with the IDF snapshot and add it to the flat layout"""
+        weights = counts * self._idf[features]
+        weights /= max(float(np.linalg.norm(weights)), 1e-9)
+        end = self._used + len(features)
+        if end > len(self._features):
+            capacity = max(end, 2 * len(self._features), 1024)
+            self._features = np.resize(self._features, capacity)
+            self._weights = np.resize(self._weights, capacity)
+            self._owners = np.resize(self._owners, capacity)
+        self._features[self._used:end] = features
+        self._weights[self._used:end] = weights
+        self._owners[self._used:end] = index
+        self._used = end
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+class DuplicateIndex:
+    """
+    In-memory similarity index over the user stories of each project
+
+    Stories are vectorized as hashed TF-IDF over the words and character
+    trigrams of the subject (counted twice) and description, so comparing
+    a candidate against every story of a project is one matrix-vector
+    product. A project is loaded from Taiga the first time it is checked
+    and kept up to date by UserStoryManager as stories are created, updated
+    and deleted. Loading happens outside the index lock, so checks against
+    other projects go on meanwhile; a failed load is remembered for a while
+    instead of being retried by every candidate.
+    """
+
+    def __init__(self, taiga_api, threshold: Optional[float] = None, dimensions: Optional[int] = None,
+                 retry_interval: Optional[float] = None) -> None:
+        """
+        Args:
+            taiga_api: TaigaAPI client used to load a project's stories
+            threshold: Cosine similarity from which a story counts as a duplicate
+                (defaults to STORY_DUPLICATE_THRESHOLD or 0.6)
+            dimensions: Size of the hashed feature space (defaults to STORY_INDEX_DIMENSIONS or 4096)
+            retry_interval: Seconds before a project whose load failed is tried again
+                (defaults to STORY_INDEX_RETRY_INTERVAL or 60)
+        """
+        self.taiga = taiga_api
+        self.threshold = threshold if threshold is not None else float(os.getenv("STORY_DUPLICATE_THRESHOLD", "0.6"))
+        self.dimensions = dimensions if dimensions is not None else int(os.getenv("STORY_INDEX_DIMENSIONS", "4096"))
+        self.retry_interval = retry_interval if retry_interval is not None else float(os.getenv("STORY_INDEX_RETRY_INTERVAL", "60"))
+        self._projects = {}
+        # Projects being loaded: their completion events and the changes made meanwhile
+        self._loading = {}
+        self._pending = {}
+        # Projects whose last load failed, by time.monotonic() of the failure
+        self._failed = {}
+        self._lock = threading.Lock()
+
+    def vectorize(self, subject: Optional[str], description: Optional[str] = None) -> np.ndarray:
+        """Hashed, sublinearly scaled term counts of a story"""
+        row = np.zeros(self.dimensions, dtype=np.float32)
+        for text, weight in ((subject, 2.0), (html_to_text(description), 1.0)):
+            for word in re.findall(r"\w+", (text or "").lower()):
+                if word in STOP_WORDS:
+                    continue
+                # Character trigrams let "pay", "payment" and "payments" overlap
+                padded = f"<{word}>"
+                features = [word] + [padded[start:start + 3] for start in range(len(padded) - 2)]
+                for feature in features:
+                    row[zlib.crc32(feature.encode("utf-8")) % self.dimensions] += weight
+        return np.log1p(row)
+
+    def find(self, project_id: Any, subject: Optional[str], description: Optional[str] = None,
+             batch: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look for an existing story similar to a candidate
+
+        Args:
+            project_id: Project the candidate would be created in; None for a
+                new project, where only the batch is compared
+            subject: Candidate subject
+            description: Candidate description
+            batch: Optional list of candidates accepted earlier in the same run;
+                the candidate is compared to them too and appended when unique
+
+        Returns:
+            Dict with "id" (None for a match within the batch), "subject" and
+            "score" of the closest duplicate, or None if the candidate is new
+        """
+        row = self.vectorize(subject, description)
+        vectors = self._load(int(project_id)) if project_id is not None else None
+        with self._lock:
+            match = None
+            if vectors is not None and vectors.ids:
+                query = _normalize(row * vectors.idf())
+                scores = vectors.scores(query)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    match = {"id": vectors.ids[best], "subject": vectors.subjects[best], "score": round(float(scores[best]), 3)}
+            if match is None and batch is not None:
+                idf = vectors.idf() if vectors is not None else 1.0
+                query = _normalize(row * idf)
+                for accepted in batch:
+                    score = float(_normalize(accepted["vector"] * idf) @ query)
+                    if score >= self.threshold:
+                        match = {"id": None, "subject": accepted["subject"], "score": round(score, 3)}
+                        break
+                if match is None:
+                    batch.append({"subject": subject, "vector": row})
+        return match
+
+    def add(self, story: Dict[str, Any]) -> None:
+        """Index a created or updated story of an already loaded project"""
+        project_id = story.get("project")
+        if project_id is None:
+            return
+        row = self.vectorize(story.get("subject"), story.get("description"))
+        with self._lock:
+            vectors = self._projects.get(int(project_id))
+            if vectors is not None:
+                vectors.add(story["id"], story.get("subject"), row)
+            elif int(project_id) in self._pending:
+                # The listing being loaded may predate this story
+                self._pending[int(project_id)].append(("add", story["id"], story.get("subject"), row))
+            # Unloaded projects pick the story up when they are first loaded
+
+    def remove(self, story_id: Any) -> None:
+        """Drop a deleted story from whichever project holds it"""
+        with self._lock:
+            for pending in self._pending.values():
+                pending.append(("remove", story_id, None, None))
+            for vectors in self._projects.values():
+                if vectors.remove(story_id):
+                    return
+
+    def _load(self, project_id: int) -> Optional[_ProjectVectors]:
+        """
+        Return a project's vectors, building them from Taiga on first use
+
+        Only one thread loads a given project; others checking it wait for
+        that load. Returns None if Taiga is unreachable, and keeps returning
+        None without retrying for retry_interval seconds.
+        """
+        with self._lock:
+            vectors = self._projects.get(project_id)
+            if vectors is not None:
+                return vectors
+            failed_at = self._failed.get(project_id)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_interval:
+                return None
+            loading = self._loading.get(project_id)
+            if loading is None:
+                loading = self._loading[project_id] = threading.Event()
+                self._pending[project_id] = []
+                loader = True
+            else:
+                loader = False
+
+        if not loader:
+            loading.wait()
+            with self._lock:
+                return self._projects.get(project_id)
+
+        vectors = None
+        try:
+            if self.taiga.ensure_authenticated():
+                vectors = _ProjectVectors(self.dimensions)
+                for story in self.taiga.iter_pages(f"{self.taiga.api_url}/userstories", {"project": project_id}):
+                    vectors.add(story["id"], story.get("subject"), self.vectorize(story.get("subject"), story.get("description")))
+        except Exception as e:
+            print(f"⚠️ Could not load stories of project {project_id} for duplicate detection: {e}")
+            vectors = None
+
+        with self._lock:
+            pending = self._pending.pop(project_id)
+            if vectors is None:
+                self._failed[project_id] = time.monotonic()
+            else:
+                for action, story_id, subject, row in pending:
+                    if action == "add":
+                        vectors.add(story_id, subject, row)
+                    else:
+                        vectors.remove(story_id)
+                self._projects[project_id] = vectors
+                self._failed.pop(project_id, None)
+            del self._loading[project_id]
+            loading.set()
+
+        if vectors is not None:
+            print(f"🔍 Indexed {len(vectors.ids)} user stories of project {project_id} for duplicate detection")
+        return vectors
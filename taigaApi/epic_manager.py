@@ -1,22 +1,23 @@
-import requests
-
 class EpicManager:
     def __init__(self, taiga_api):
         self.taiga = taiga_api
 
     def get_epics(self, project_id):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             if project_id is None:
                 url = f"{self.taiga.api_url}/epics"
             else:
                 url =  f"{self.taiga.api_url}/epics?project={project_id}"
-            response = requests.get(url, headers=self.taiga.get_headers())
+            cached = self.taiga.cache.get(url)
+            if cached is not None:
+                return cached
+            response = self.taiga.request("GET", url, headers={"x-disable-pagination": "True"})
             response.raise_for_status()
             epics = response.json()
+            self.taiga.cache.set(url, epics)
             print(f"✅ Found {len(epics)} epics for project ID {project_id}")
             return epics
             
@@ -24,16 +25,31 @@ class EpicManager:
             print(f"❌ Failed to get epics: {e}")
             return None
     
+    def iter_epics(self, project_id=None):
+        """Lazily iterate over the epics of a project, page by page"""
+        if not self.taiga.ensure_authenticated():
+            raise RuntimeError("Taiga authentication failed")
+        
+        params = {"project": project_id} if project_id is not None else {}
+        try:
+            yield from self.taiga.iter_pages(f"{self.taiga.api_url}/epics", params)
+        except Exception as e:
+            print(f"❌ Failed to iterate epics: {e}")
+            raise
+    
     def get_epic(self, epic_id):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.taiga.api_url}/epics/{epic_id}"
-            response = requests.get(url, headers=self.taiga.get_headers())
+            cached = self.taiga.cache.get(url)
+            if cached is not None:
+                return cached
+            response = self.taiga.request("GET", url)
             response.raise_for_status()
             epic = response.json()
+            self.taiga.cache.set(url, epic)
             print(f"✅ Retrieved epic '{epic.get('subject')}'")
             return epic
             
@@ -42,9 +58,8 @@ class EpicManager:
             return None
     
     def create_epic(self, project_id, subject, description=None, assigned_to=None, tags=None):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         try:
             url = f"{self.taiga.api_url}/epics"
             
@@ -58,9 +73,10 @@ class EpicManager:
             if assigned_to:
                 payload["assigned_to"] = assigned_to
             
-            response = requests.post(url, headers=self.taiga.get_headers(), json=payload)
+            response = self.taiga.request("POST", url, json=payload)
             response.raise_for_status()
             epic = response.json()
+            self.taiga.cache.invalidate(url, f"{url}?project={project_id}")
             print(f"✅ Created epic '{subject}'")
             return epic
             
@@ -71,16 +87,20 @@ class EpicManager:
             return None
     
     def update_epic(self, epic_id, updates):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.taiga.api_url}/epics/{epic_id}"
             
-            response = requests.patch(url, headers=self.taiga.get_headers(), json=updates)
+            response = self.taiga.request("PATCH", url, json=updates)
             response.raise_for_status()
             epic = response.json()
+            self.taiga.cache.invalidate(
+                url,
+                f"{self.taiga.api_url}/epics",
+                f"{self.taiga.api_url}/epics?project={epic.get('project')}"
+            )
             print(f"✅ Updated epic '{epic.get('subject')}'")
             return epic
             
@@ -91,14 +111,17 @@ class EpicManager:
             return None
 
     def delete_epic(self, epic_id):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return False
+        if not self.taiga.ensure_authenticated():
+            return False
 
         try:
             url = f"{self.taiga.api_url}/epics/{epic_id}"
-            response = requests.delete(url, headers=self.taiga.get_headers())
+            response = self.taiga.request("DELETE", url)
             response.raise_for_status()
+            # The owning project is unknown here, so drop every epic list
+            epics_url = f"{self.taiga.api_url}/epics"
+            self.taiga.cache.invalidate(url, f"{url}/related_userstories")
+            self.taiga.cache.invalidate_if(lambda key: key == epics_url or key.startswith(f"{epics_url}?"))
             print(f"\u2705 Deleted epic with ID {epic_id}")
             return True
         except Exception as e:
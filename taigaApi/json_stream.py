@@ -0,0 +1,77 @@
+import json
+from typing import Any, Dict, List
+
+class JSONArrayStreamParser:
+    """
+    Incrementally extract the objects of a JSON array from streamed text
+
+    Handles both a bare array ("[{...}, {...}]") and an array wrapped in an
+    object ('{"stories": [{...}]}'). Each element object is returned as soon
+    as its closing brace arrives, so callers can act on it while the rest is
+    still being generated. Text before the JSON (such as a code fence, or
+    prose containing brackets) is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = []
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._in_element = False
+        self._produced = 0
+        self.done = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next chunk of text
+
+        Args:
+            text: Next piece of the model output
+
+        Returns:
+            Element objects completed by this chunk, in order
+        """
+        completed = []
+        for char in text:
+            if self.done:
+                break
+            if self._in_element:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if not self._stack and char not in "[{":
+                # Prose or fences before the JSON starts
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if char == "{" and self._is_element_position():
+                    self._in_element = True
+                    self._buffer = [char]
+                self._stack.append(char)
+            elif char in "]}":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == "}" and self._in_element and self._is_element_position():
+                    completed.append(json.loads("".join(self._buffer)))
+                    self._produced += 1
+                    self._in_element = False
+                    self._buffer = []
+                if not self._stack:
+                    # Brackets in prose ("the stories [draft]:") close without elements; keep looking
+                    self.done = self._produced > 0
+        return completed
+
+    def _is_element_position(self) -> bool:
+        """True when the parser sits directly inside the top-level (or wrapped) array"""
+        return self._stack in (["["], ["{", "["])
@@ -0,0 +1,298 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from result_shaping import html_to_text
+
+# Search index kind of each mirrored table
+KINDS = {"projects": "project", "epics": "epic", "user_stories": "user_story"}
+
+def _search_rowid(table, object_id):
+    """Stable FTS rowid per object, so entries are replaced without a table scan"""
+    return int(object_id) * len(KINDS) + list(KINDS).index(table)
+
+# Mirrored Taiga collections: (table, API path, supports modified_date filters)
+RESOURCES = (
+    ("projects", "projects", False),
+    ("epics", "epics", True),
+    ("user_stories", "userstories", True),
+)
+
+class TaigaMirror:
+    """Local SQLite copy of projects, epics and user stories with full-text search"""
+
+    def __init__(self, taiga_api, path=None, max_age=None, full_sync_interval=None):
+        """
+        Args:
+            taiga_api: TaigaAPI client used for syncing
+            path: SQLite database file (defaults to TAIGA_MIRROR_PATH or .taiga_mirror.sqlite3)
+            max_age: Seconds after a sync during which the mirror counts as fresh (TAIGA_MIRROR_MAX_AGE, 60)
+            full_sync_interval: Seconds between full syncs that also drop deleted objects (TAIGA_MIRROR_FULL_SYNC, 3600)
+        """
+        self.taiga = taiga_api
+        self.path = path or os.getenv("TAIGA_MIRROR_PATH", ".taiga_mirror.sqlite3")
+        self.max_age = max_age if max_age is not None else float(os.getenv("TAIGA_MIRROR_MAX_AGE", "60"))
+        self.full_sync_interval = full_sync_interval or float(os.getenv("TAIGA_MIRROR_FULL_SYNC", "3600"))
+        self.synced_at = None
+        self.stale = True
+        self._sync_lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for table in ("projects", "epics", "user_stories"):
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "id INTEGER PRIMARY KEY, project INTEGER, modified_date TEXT, data TEXT NOT NULL)"
+                )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS epic_links ("
+                "epic_id INTEGER NOT NULL, user_story_id INTEGER NOT NULL, PRIMARY KEY (epic_id, user_story_id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS epic_links_story ON epic_links (user_story_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "resource TEXT PRIMARY KEY, last_modified TEXT, full_synced_at REAL)"
+            )
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5("
+                "kind UNINDEXED, object_id UNINDEXED, project UNINDEXED, subject, body, tokenize='unicode61', prefix='2 3')"
+            )
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def is_fresh(self):
+        """True when the mirror was synced recently and no write happened since"""
+        return not self.stale and self.synced_at is not None and time.monotonic() - self.synced_at < self.max_age
+
+    def mark_stale(self):
+        """Record that Taiga changed through this process; the next read syncs first"""
+        self.stale = True
+
+    def ensure_fresh(self):
+        """Sync incrementally unless the mirror is already fresh"""
+        if self.is_fresh():
+            return True
+        return self.sync()
+
+    def sync(self, full=False):
+        """
+        Bring the mirror up to date
+
+        Epics and user stories changed since the last sync are fetched with
+        modified_date filters; projects are few and fetched whole. A full
+        sync, done periodically or on request, also removes deleted objects.
+
+        Returns:
+            Boolean indicating success
+        """
+        if not self.taiga.ensure_authenticated():
+            return False
+
+        with self._sync_lock:
+            # Writes made while this sync runs must not be masked by it
+            self.stale = False
+            started = time.time()
+            try:
+                changed = 0
+                for table, path, incremental in RESOURCES:
+                    changed += self._sync_resource(table, path, incremental, full)
+                self.synced_at = time.monotonic()
+                print(f"✅ Taiga mirror synced ({changed} changed objects, {time.time() - started:.2f}s)")
+                return True
+            except Exception as e:
+                self.stale = True
+                print(f"❌ Taiga mirror sync failed: {e}")
+                return False
+
+    def _sync_resource(self, table, path, incremental, full):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT last_modified, full_synced_at FROM sync_state WHERE resource = ?", (table,)
+            ).fetchone()
+        last_modified, full_synced_at = row or (None, None)
+
+        full = full or not incremental or not last_modified or \
+            full_synced_at is None or time.time() - full_synced_at > self.full_sync_interval
+        params = {} if full else {"modified_date__gte": last_modified}
+
+        seen = set()
+        newest = last_modified
+        changed = 0
+        batch = []
+        for item in self.taiga.iter_pages(f"{self.taiga.api_url}/{path}", params):
+            seen.add(item["id"])
+            modified = item.get("modified_date")
+            if modified and (newest is None or modified > newest):
+                newest = modified
+            batch.append(item)
+            if len(batch) >= 200:
+                changed += self._upsert(table, batch)
+                batch = []
+        changed += self._upsert(table, batch)
+
+        with self._connect() as conn:
+            if full:
+                # Anything not listed by a full fetch was deleted in Taiga
+                stale_ids = [
+                    (object_id,) for (object_id,) in conn.execute(f"SELECT id FROM {table}")
+                    if object_id not in seen
+                ]
+                self._delete_rows(conn, table, stale_ids)
+            conn.execute(
+                "INSERT INTO sync_state (resource, last_modified, full_synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(resource) DO UPDATE SET last_modified = excluded.last_modified, "
+                "full_synced_at = COALESCE(excluded.full_synced_at, sync_state.full_synced_at)",
+                (table, newest, time.time() if full else None)
+            )
+        return changed
+
+    def _upsert(self, table, items):
+        """Store fetched objects and refresh their search entries; returns how many changed"""
+        if not items:
+            return 0
+
+        kind = KINDS[table]
+        changed = 0
+        with self._connect() as conn:
+            for item in items:
+                existing = conn.execute(f"SELECT modified_date FROM {table} WHERE id = ?", (item["id"],)).fetchone()
+                if existing and item.get("modified_date") and existing[0] == item.get("modified_date"):
+                    continue
+                changed += 1
+                project = item["id"] if table == "projects" else item.get("project")
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {table} (id, project, modified_date, data) VALUES (?, ?, ?, ?)",
+                    (item["id"], project, item.get("modified_date"), json.dumps(item))
+                )
+                rowid = _search_rowid(table, item["id"])
+                conn.execute("DELETE FROM search WHERE rowid = ?", (rowid,))
+                conn.execute(
+                    "INSERT INTO search (rowid, kind, object_id, project, subject, body) VALUES (?, ?, ?, ?, ?, ?)",
+                    (rowid, kind, item["id"], project, item.get("subject") or item.get("name") or "",
+                     html_to_text(item.get("description")))
+                )
+                if table == "user_stories" and "epics" in item:
+                    conn.execute("DELETE FROM epic_links WHERE user_story_id = ?", (item["id"],))
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO epic_links (epic_id, user_story_id) VALUES (?, ?)",
+                        [(epic["id"], item["id"]) for epic in item["epics"] or []]
+                    )
+        return changed
+
+    def remove(self, table, object_id):
+        """Drop an object deleted through this process, with its links and search entry"""
+        with self._connect() as conn:
+            self._delete_rows(conn, table, [(int(object_id),)])
+
+    def add_link(self, epic_id, user_story_id):
+        """Record an epic link created through this process"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO epic_links (epic_id, user_story_id) VALUES (?, ?)",
+                (int(epic_id), int(user_story_id))
+            )
+
+    def _delete_rows(self, conn, table, ids):
+        if not ids:
+            return
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", ids)
+        conn.executemany("DELETE FROM search WHERE rowid = ?", [(_search_rowid(table, object_id),) for (object_id,) in ids])
+        if table == "epics":
+            conn.executemany("DELETE FROM epic_links WHERE epic_id = ?", ids)
+        elif table == "user_stories":
+            conn.executemany("DELETE FROM epic_links WHERE user_story_id = ?", ids)
+        elif table == "projects":
+            for child in ("epics", "user_stories"):
+                child_ids = []
+                for (project_id,) in ids:
+                    child_ids += conn.execute(f"SELECT id FROM {child} WHERE project = ?", (project_id,)).fetchall()
+                self._delete_rows(conn, child, child_ids)
+
+    def list_projects(self):
+        return self._load("SELECT data FROM projects ORDER BY id")
+
+    def list_epics(self, project_id=None):
+        if project_id is None:
+            return self._load("SELECT data FROM epics ORDER BY id")
+        return self._load("SELECT data FROM epics WHERE project = ? ORDER BY id", (int(project_id),))
+
+    def list_user_stories(self, epic_id=None):
+        if epic_id is None:
+            return self._load("SELECT data FROM user_stories ORDER BY id")
+        return self._load(
+            "SELECT data FROM user_stories JOIN epic_links ON epic_links.user_story_id = user_stories.id "
+            "WHERE epic_links.epic_id = ? ORDER BY user_stories.id",
+            (int(epic_id),)
+        )
+
+    def project_overview(self):
+        """Every project's id and name with its epic and user story counts"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, json_extract(data, '$.name'), "
+                "(SELECT COUNT(*) FROM epics WHERE epics.project = projects.id), "
+                "(SELECT COUNT(*) FROM user_stories WHERE user_stories.project = projects.id) "
+                "FROM projects ORDER BY id"
+            ).fetchall()
+        return [{"id": row[0], "name": row[1], "epics": row[2], "user_stories": row[3]} for row in rows]
+
+    def epic_overview(self, project_id):
+        """A project's epics (id and subject) with their linked user story counts"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, json_extract(data, '$.subject'), "
+                "(SELECT COUNT(*) FROM epic_links WHERE epic_links.epic_id = epics.id) "
+                "FROM epics WHERE project = ? ORDER BY id",
+                (int(project_id),)
+            ).fetchall()
+        return [{"id": row[0], "subject": row[1], "user_stories": row[2]} for row in rows]
+
+    def _load(self, query, params=()):
+        with self._connect() as conn:
+            return [json.loads(data) for (data,) in conn.execute(query, params)]
+
+    def search(self, query, project_id=None, kinds=None, limit=20):
+        """
+        Full-text search over subjects and descriptions
+
+        Args:
+            query: Words to look for; each must match, as a word prefix
+            project_id: Optional project to search in
+            kinds: Optional subset of "project", "epic" and "user_story"
+            limit: Maximum number of hits
+
+        Returns:
+            Hits ordered by relevance, each with "kind", "id", "project",
+            "subject" and a highlighted "snippet"
+        """
+        terms = re.findall(r"\w+", query or "")
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"*' for term in terms)
+
+        sql = (
+            "SELECT kind, object_id, project, subject, snippet(search, 4, '[', ']', '…', 12) "
+            "FROM search WHERE search MATCH ?"
+        )
+        params = [match]
+        if project_id is not None:
+            sql += " AND project = ?"
+            params.append(int(project_id))
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params += list(kinds)
+        sql += " ORDER BY bm25(search, 0, 0, 0, 4.0, 1.0) LIMIT ?"
+        params.append(int(limit))
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {"kind": kind, "id": object_id, "project": project, "subject": subject, "snippet": snippet}
+            for kind, object_id, project, subject, snippet in rows
+        ]
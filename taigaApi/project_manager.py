@@ -1,13 +1,10 @@
-import requests
-
 class ProjectManager:
     def __init__(self, taiga_api):
         self.taiga = taiga_api
     
     def create_project(self, name, description):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.taiga.api_url}/projects"
@@ -17,9 +14,10 @@ class ProjectManager:
                 "description": description
             }
             
-            response = requests.post(url, headers=self.taiga.get_headers(), json=payload)
+            response = self.taiga.request("POST", url, json=payload)
             response.raise_for_status()
             project = response.json()
+            self.taiga.cache.invalidate(url)
             print(f"✅ Created project '{name}'")
             return project
             
@@ -30,15 +28,18 @@ class ProjectManager:
             return None
     
     def get_projects(self):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.taiga.api_url}/projects"
-            response = requests.get(url, headers=self.taiga.get_headers())
+            cached = self.taiga.cache.get(url)
+            if cached is not None:
+                return cached
+            response = self.taiga.request("GET", url, headers={"x-disable-pagination": "True"})
             response.raise_for_status()
             projects = response.json()
+            self.taiga.cache.set(url, projects)
             print(f"✅ Found {len(projects)} projects")
             return projects
             
@@ -46,16 +47,30 @@ class ProjectManager:
             print(f"❌ Failed to get projects: {e}")
             return None
     
+    def iter_projects(self):
+        """Lazily iterate over all projects, page by page"""
+        if not self.taiga.ensure_authenticated():
+            raise RuntimeError("Taiga authentication failed")
+        
+        try:
+            yield from self.taiga.iter_pages(f"{self.taiga.api_url}/projects")
+        except Exception as e:
+            print(f"❌ Failed to iterate projects: {e}")
+            raise
+    
     def get_project(self, project_id):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.taiga.api_url}/projects/{project_id}"
-            response = requests.get(url, headers=self.taiga.get_headers())
+            cached = self.taiga.cache.get(url)
+            if cached is not None:
+                return cached
+            response = self.taiga.request("GET", url)
             response.raise_for_status()
             project = response.json()
+            self.taiga.cache.set(url, project)
             print(f"✅ Retrieved project '{project.get('name')}'")
             return project
             
@@ -64,14 +79,18 @@ class ProjectManager:
             return None
 
     def delete_project(self, project_id):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return False
+        if not self.taiga.ensure_authenticated():
+            return False
 
         try:
             url = f"{self.taiga.api_url}/projects/{project_id}"
-            response = requests.delete(url, headers=self.taiga.get_headers())
+            response = self.taiga.request("DELETE", url)
             response.raise_for_status()
+            # Epics and stories of a deleted project disappear with it
+            self.taiga.cache.invalidate(url, f"{self.taiga.api_url}/projects")
+            self.taiga.cache.invalidate_if(
+                lambda key: key.startswith(f"{self.taiga.api_url}/epics") or key.startswith(f"{self.taiga.api_url}/userstories")
+            )
             print(f"\u2705 Deleted project with ID {project_id}")
             return True
         except Exception as e:
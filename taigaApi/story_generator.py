@@ -1,12 +1,61 @@
-from typing import List, Dict, Any, Optional
-import json
+from typing import List, Dict, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import threading
+from taigaApi.json_stream import JSONArrayStreamParser
+
+# Structured output schema for generated stories; an object at the top level
+# because strict JSON schema mode does not accept a bare array
+STORY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "user_stories",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "stories": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "subject": {"type": "string"},
+                            "description": {"type": "string"}
+                        },
+                        "required": ["subject", "description"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["stories"],
+            "additionalProperties": False
+        }
+    }
+}
 
 class StoryGenerator:
+    # Sampling parameters for story generation; part of the response cache key
+    generation_params = {"temperature": 0.7, "max_tokens": 2000}
+    
     def __init__(self, taiga_api, azure_ai_client):
         self.taiga = taiga_api
         self.ai_client = azure_ai_client
     
-    def breakdown_epic_into_stories(self, project_id: Any, epic_id: Any) -> List[Dict[str, Any]]:
+    def breakdown_epic_into_stories(self, project_id: Any, epic_id: Any, use_cache: bool = True,
+                                    progress: Optional[Callable[..., None]] = None) -> List[Dict[str, Any]]:
+        """
+        Generate user stories for an epic with AI and create them in Taiga
+        
+        Args:
+            project_id: Project ID
+            epic_id: Epic ID
+            use_cache: Reuse a stored completion for an unchanged epic
+            progress: Optional callback receiving stage updates as keyword arguments
+            
+        Returns:
+            Per-story results as returned by UserStoryManager.create_stories_for_epic;
+            stories skipped as near duplicates have "story" None and a "duplicate_of" match
+        """
         from taigaApi.epic_manager import EpicManager
         from taigaApi.user_story_manager import UserStoryManager
         
@@ -24,101 +73,241 @@ class StoryGenerator:
         epic_description = epic.get("description", "")
         
         print(f"🔍 Analyzing epic: '{epic_subject}'")
-        
-        # Create a prompt for the AI to generate user stories
-        system_prompt = """
-        You are an expert product manager who knows how to break down epics into user stories.
-        Analyze the epic description and generate a set of user stories that cover the functionality described.
-        Each user story should be clear, concise, and follow the format: "As a [user type], I want [action] so that [benefit]".
-        Provide a detailed description for each story that elaborates on the implementation details, acceptance criteria, and any notes for developers.
-        """
-        
-        user_prompt = f"""
-        Epic Subject: {epic_subject}
-        Epic Description: {epic_description}
-        
-        Generate 3-5 user stories that cover the functionality described in this epic.
-        Return your response as a JSON array of objects with the following structure:
-        [
-            {{
-                "subject": "Story title in user story format",
-                "description": "Detailed description including acceptance criteria"
-            }}
-        ]
-        """
+        report = progress or (lambda **fields: None)
+        report(stage="generating", epic=epic_subject)
         
         if not self.ai_client.client:
             print("❌ Azure OpenAI client is not initialized")
             return []
         
         try:
-            # Call the Azure OpenAI API to generate user stories
-            response = self.ai_client.client.chat.completions.create(
-                model=self.ai_client.deployment,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
+            messages = self._build_messages(epic_subject, epic_description)
+            cache = self.ai_client.response_cache
+            cache_key = cache.make_key(self.ai_client.deployment, messages, self.cache_params())
             
-            # Extract the content from the response
-            content = response.choices[0].message.content
+            completed = [0]
+            completed_lock = threading.Lock()
+            # Stories accepted so far in this run, so the model cannot repeat itself either
+            accepted = []
             
-            # Parse the JSON response
-            try:
-                # Find the first opening bracket and the last closing bracket
-                start_idx = content.find('[')
-                end_idx = content.rfind(']') + 1
-                
-                if start_idx != -1 and end_idx != -1:
-                    json_content = content[start_idx:end_idx]
-                    user_stories_data = json.loads(json_content)
-                else:
-                    # Handle case where JSON is not properly formatted
-                    print("⚠️ AI response did not contain properly formatted JSON. Attempting to fix...")
-                    # Simple cleanup attempt
-                    json_content = content.strip().replace("```json", "").replace("```", "")
-                    user_stories_data = json.loads(json_content)
-            except Exception as json_error:
-                print(f"❌ Failed to parse AI response as JSON: {json_error}")
-                print(f"AI Response: {content}")
-                return []
+            def on_result(result):
+                with completed_lock:
+                    completed[0] += 1
+                    report(stage="creating", completed=completed[0], total=total[0])
+            
+            def outcome(future, story_data):
+                """A story creation's result, or a failed result if it raised"""
+                error = future.exception()
+                if error is None:
+                    return future.result()
+                return {"subject": story_data.get("subject"), "story": None, "linked": False, "error": str(error)}
             
-            # Create the user stories in Taiga
-            created_stories = []
-            for story_data in user_stories_data:
-                subject = story_data.get("subject")
-                description = story_data.get("description")
+            content = cache.get(cache_key) if use_cache else None
+            if content is not None:
+                print("♻️ Reusing cached user stories for unchanged epic")
+                user_stories_data = self._parse_stories(content)
+                if user_stories_data is None:
+                    return []
                 
-                print(f"📝 Creating user story: '{subject}'")
+                unique, skipped = [], []
+                for story_data in user_stories_data:
+                    duplicate = self._find_duplicate(project_id, story_data, accepted)
+                    if duplicate:
+                        skipped.append(duplicate)
+                    else:
+                        unique.append(story_data)
                 
-                # Create the user story (without linking to epic)
-                story = user_story_manager.create_user_story(
-                    project_id=project_id,
-                    subject=subject,
-                    description=description
-                )
+                # Everything is known up front, so create the stories in one bulk request
+                total = [len(unique)]
+                report(stage="creating", completed=0, total=total[0])
+                results = user_story_manager.create_stories_for_epic(project_id, epic_id, unique, on_result) + skipped
+            else:
+                # Create and link each story as soon as the model has finished writing it
+                total = [None]
+                content_parts = []
+                futures = []
+                skipped = []
+                stream_error = None
+                with ThreadPoolExecutor(max_workers=self.taiga.pool_size) as executor:
+                    try:
+                        for story_data in self._stream_stories(messages, content_parts):
+                            duplicate = self._find_duplicate(project_id, story_data, accepted)
+                            if duplicate:
+                                skipped.append(duplicate)
+                                continue
+                            future = executor.submit(user_story_manager.create_story_for_epic, project_id, epic_id, story_data)
+                            future.add_done_callback(lambda done, data=story_data: on_result(outcome(done, data)))
+                            futures.append((future, story_data))
+                    except Exception as e:
+                        # Stories created before the failure are still reported
+                        stream_error = e
+                        print(f"❌ Story generation stopped early: {e}")
+                    total[0] = len(futures)
+                results = [outcome(future, story_data) for future, story_data in futures] + skipped
                 
-                if story:
-                    # Now link the user story to the epic using the separate endpoint
-                    story_id = story.get("id")
-                    success = user_story_manager.link_user_story_to_epic(
-                        user_story_id=story_id,
-                        epic_id=epic_id
-                    )
-                    
-                    if success:
-                        print(f"🔗 Linked user story '{subject}' to epic '{epic_subject}'")
-                    else:
-                        print(f"⚠️ Failed to link user story '{subject}' to epic '{epic_subject}'")
-                    
-                    created_stories.append(story)
+                # Only cache completions that streamed through completely
+                if results and stream_error is None:
+                    cache.set(cache_key, "".join(content_parts))
+                elif not results:
+                    print(f"❌ AI response did not contain any user stories: {''.join(content_parts)[:500]}")
             
-            print(f"✅ Created {len(created_stories)} user stories for epic '{epic_subject}'")
-            return created_stories
+            for result in results:
+                if result["error"]:
+                    print(f"⚠️ User story '{result['subject']}': {result['error']}")
+            
+            created_count = len([result for result in results if result["story"]])
+            print(f"✅ Created {created_count} user stories for epic '{epic_subject}'")
+            if skipped:
+                print(f"♻️ Skipped {len(skipped)} near-duplicate user stories")
+            return results
             
         except Exception as e:
             print(f"❌ Error generating stories from epic: {e}")
             return []
+    
+    def breakdown_project(self, project_id: Any, max_workers: Optional[int] = None,
+                          progress: Optional[Callable[..., None]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Break down every epic of a project into user stories
+        
+        Epics are processed concurrently; the model calls they make are paced
+        by the AI client's rate-limit scheduler.
+        
+        Args:
+            project_id: Project ID
+            max_workers: Epics processed at once (defaults to BREAKDOWN_CONCURRENCY or 4)
+            progress: Optional callback receiving updates as keyword arguments
+            
+        Returns:
+            Per-epic dicts with "epic_id", "subject", "results" and "error",
+            in the project's epic order, or None if the epics could not be listed
+        """
+        from taigaApi.epic_manager import EpicManager
+        
+        epics = EpicManager(self.taiga).get_epics(project_id)
+        if epics is None:
+            print(f"❌ Failed to list epics for project {project_id}")
+            return None
+        
+        report = progress or (lambda **fields: None)
+        total = len(epics)
+        report(stage="epics", completed=0, total=total)
+        
+        def breakdown(epic):
+            outcome = {"epic_id": epic.get("id"), "subject": epic.get("subject"), "results": [], "error": None}
+            try:
+                outcome["results"] = self.breakdown_epic_into_stories(project_id, epic.get("id"))
+                if not any(result.get("story") or result.get("duplicate_of") for result in outcome["results"]):
+                    outcome["error"] = "No user stories were created"
+            except Exception as e:
+                outcome["error"] = str(e)
+            return outcome
+        
+        workers = max_workers or int(os.getenv("BREAKDOWN_CONCURRENCY", "4"))
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, total or 1))) as executor:
+            futures = {executor.submit(breakdown, epic): index for index, epic in enumerate(epics)}
+            for future in as_completed(futures):
+                outcome = future.result()
+                outcomes[futures[future]] = outcome
+                report(stage="epics", completed=len(outcomes), total=total, last_epic=outcome["subject"])
+        
+        print(f"✅ Broke down {total} epics in project {project_id}")
+        return [outcomes[index] for index in range(total)]
+    
+    def cache_params(self) -> Dict[str, Any]:
+        """Request parameters that, with the prompt, identify a cached completion"""
+        return {**self.generation_params, "response_format": STORY_RESPONSE_FORMAT}
+    
+    def _stream_stories(self, messages: List[Dict[str, str]], content_parts: List[str]):
+        """
+        Stream a completion and yield each story as soon as its JSON object closes
+        
+        Args:
+            messages: Chat messages from _build_messages
+            content_parts: List that receives the raw text, for caching
+        """
+        try:
+            stream = self.ai_client.create_chat_completion(
+                "story_generator",
+                messages=messages,
+                response_format=STORY_RESPONSE_FORMAT,
+                stream=True,
+                **self.generation_params
+            )
+        except Exception as e:
+            if getattr(e, "status_code", None) != 400:
+                raise
+            # Older API versions reject json_schema; the prompt still asks for JSON
+            print(f"⚠️ Structured output rejected ({e}), falling back to plain JSON")
+            stream = self.ai_client.create_chat_completion(
+                "story_generator",
+                messages=messages,
+                stream=True,
+                **self.generation_params
+            )
+        
+        parser = JSONArrayStreamParser()
+        for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            text = chunk.choices[0].delta.content
+            content_parts.append(text)
+            yield from parser.feed(text)
+    
+    def _find_duplicate(self, project_id: Any, story_data: Dict[str, Any],
+                        accepted: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return a skipped-story result if the story duplicates an existing or accepted one"""
+        index = self.taiga.duplicate_index
+        if index is None:
+            return None
+        try:
+            match = index.find(project_id, story_data.get("subject"), story_data.get("description"), accepted)
+        except Exception as e:
+            print(f"⚠️ Duplicate check failed, creating the story anyway: {e}")
+            return None
+        if match is None:
+            return None
+        return {"subject": story_data.get("subject"), "story": None, "linked": False, "error": None, "duplicate_of": match}
+    
+    def _build_messages(self, epic_subject: str, epic_description: str) -> List[Dict[str, str]]:
+        """Build the chat messages asking the model to break down an epic"""
+        system_prompt = """
+        You are an expert product manager who knows how to break down epics into user stories.
+        Analyze the epic description and generate a set of user stories that cover the functionality described.
+        Each user story should be clear, concise, and follow the format: "As a [user type], I want [action] so that [benefit]".
+        Provide a detailed description for each story that elaborates on the implementation details, acceptance criteria, and any notes for developers.
+        """
+        
+        user_prompt = f"""
+        Epic Subject: {epic_subject}
+        Epic Description: {epic_description}
+        
+        Generate 3-5 user stories that cover the functionality described in this epic.
+        Return your response as a JSON object with the following structure:
+        {{
+            "stories": [
+                {{
+                    "subject": "Story title in user story format",
+                    "description": "Detailed description including acceptance criteria"
+                }}
+            ]
+        }}
+        """
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _parse_stories(self, content: str) -> Optional[List[Dict[str, Any]]]:
+        """Extract the stories from a complete model response"""
+        try:
+            stories = JSONArrayStreamParser().feed(content or "")
+            if stories:
+                return stories
+            print("❌ AI response did not contain any user stories")
+        except Exception as json_error:
+            print(f"❌ Failed to parse AI response as JSON: {json_error}")
+        print(f"AI Response: {content}")
+        return None
@@ -1,6 +1,16 @@
 import os
+import re
+import json
+import time
+import base64
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from taigaApi.cache import TTLCache
+from metrics import REGISTRY
 
 # Load environment variables
 load_dotenv()
@@ -16,9 +26,208 @@ class TaigaAPI:
         self.auth_token = None
         self.refresh_token = None
         self.user_id = None
+        # Set when Taiga answered the last login with a client error (wrong username or password)
+        self.credentials_rejected = False
+        
+        # Optional TaigaMirror kept in step with writes made through this client
+        self.mirror = None
+        
+        # Optional DuplicateIndex kept in step by UserStoryManager
+        self.duplicate_index = None
+        self.token_expires_at = None
+        
+        # Only one thread (re)authenticates at a time; the others reuse its token
+        self._auth_lock = threading.Lock()
+        self.refresh_skew = float(os.getenv("TAIGA_TOKEN_REFRESH_SKEW", "60"))
+        
+        # Connection pool settings shared by every manager using this client
+        self.pool_size = int(os.getenv("TAIGA_POOL_SIZE", "10"))
+        self.timeout = float(os.getenv("TAIGA_TIMEOUT", "30"))
+        self.max_retries = int(os.getenv("TAIGA_MAX_RETRIES", "3"))
+        self.page_size = int(os.getenv("TAIGA_PAGE_SIZE", "100"))
+        self.session = self._create_session()
+        
+        # Read-through cache for GET responses, keyed by request URL
+        self.cache = TTLCache(
+            maxsize=int(os.getenv("TAIGA_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("TAIGA_CACHE_TTL", "30"))
+        )
+        REGISTRY.register_callback("taiga_cache_hits_total", "counter", "Taiga read cache hits", lambda: self.cache.hits)
+        REGISTRY.register_callback("taiga_cache_misses_total", "counter", "Taiga read cache misses", lambda: self.cache.misses)
         
         print(f"✅ Taiga API client initialized with URL: {self.api_url}")
     
+    def _create_session(self):
+        """Create a keep-alive session with a bounded connection pool.
+        
+        Retries with backoff are limited to idempotent verbs so that a
+        failed POST never creates the same artifact twice.
+        """
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=["GET", "HEAD", "OPTIONS", "PUT", "DELETE"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the pooled session
+        
+        Args:
+            method: HTTP verb
+            url: Absolute API URL
+            **kwargs: Extra arguments passed to requests (json, params, ...)
+            
+        Returns:
+            requests.Response
+        """
+        extra_headers = kwargs.pop("headers", None) or {}
+        token = self.auth_token
+        response = self._send(method, url, headers={**self.get_headers(), **extra_headers}, **kwargs)
+        
+        # An expired token is refreshed once and the request replayed; a 401
+        # means the server did not act on it, so this is safe for writes too
+        if response.status_code == 401 and token and self._reauthenticate(token):
+            response = self._send(method, url, headers={**self.get_headers(), **extra_headers}, **kwargs)
+        
+        if self.mirror is not None and method != "GET" and response.ok:
+            self._update_mirror(method, url, kwargs.get("json"))
+        return response
+    
+    def _update_mirror(self, method, url, payload):
+        """Apply a successful write to the local mirror"""
+        try:
+            path = url[len(self.api_url):].split("?")[0]
+            match = re.match(r"^/(projects|epics|userstories)/(\d+)$", path)
+            if method == "DELETE" and match:
+                table = "user_stories" if match.group(1) == "userstories" else match.group(1)
+                self.mirror.remove(table, match.group(2))
+            match = re.match(r"^/epics/(\d+)/related_userstories$", path)
+            if method == "POST" and match and payload:
+                self.mirror.add_link(match.group(1), payload["user_story"])
+        except Exception as e:
+            print(f"⚠️ Could not update Taiga mirror: {e}")
+        # Creates and updates are picked up by the next incremental sync
+        self.mirror.mark_stale()
+    
+    def ensure_authenticated(self):
+        """
+        Make sure a usable token is present, refreshing it shortly before it expires
+        
+        Returns:
+            Boolean indicating whether a token is available
+        """
+        token = self.auth_token
+        if token and not self._token_expiring():
+            return True
+        return self._reauthenticate(token)
+    
+    def _reauthenticate(self, stale_token):
+        """
+        Replace stale_token with a fresh one, single-flight across threads
+        
+        Callers that were waiting for the lock find the token already
+        replaced and reuse it instead of authenticating again.
+        """
+        with self._auth_lock:
+            if self.auth_token and self.auth_token != stale_token and not self._token_expiring():
+                return True
+            if self.auth_token:
+                return self.refresh_authentication()
+            return self.authenticate()
+    
+    def _token_expiring(self):
+        return self.token_expires_at is not None and time.time() >= self.token_expires_at - self.refresh_skew
+    
+    def _set_tokens(self, auth_token, refresh_token):
+        self.auth_token = auth_token
+        self.refresh_token = refresh_token
+        self.token_expires_at = self._token_expiry(auth_token)
+    
+    @staticmethod
+    def _token_expiry(token):
+        """Read the "exp" claim of a JWT without verifying it; None if not a JWT"""
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+        except Exception:
+            return None
+    
+    def _send(self, method, url, **kwargs):
+        """Send a request on the pooled session and record its latency"""
+        kwargs.setdefault("timeout", self.timeout)
+        status = "error"
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            REGISTRY.observe(
+                "taiga_request_duration_seconds",
+                time.perf_counter() - started,
+                method=method,
+                endpoint=self._endpoint_label(url),
+                status=status
+            )
+    
+    def _endpoint_label(self, url):
+        """Turn a request URL into a low-cardinality label such as /epics/{id}"""
+        path = url.split("?", 1)[0]
+        if path.startswith(self.api_url):
+            path = path[len(self.api_url):]
+        return re.sub(r"/\d+", "/{id}", path) or "/"
+    
+    def iter_pages(self, url, params=None):
+        """
+        Iterate over every item of a paginated list endpoint
+        
+        Follows Taiga's x-pagination-next header and fetches the next page
+        in the background while the current one is being consumed.
+        
+        Args:
+            url: List endpoint URL
+            params: Optional query parameters for the first page
+            
+        Yields:
+            Items of each page as they arrive
+        """
+        params = dict(params or {})
+        params.setdefault("page", 1)
+        params.setdefault("page_size", self.page_size)
+        
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="taiga-prefetch")
+        try:
+            future = executor.submit(self.request, "GET", url, params=params)
+            while future is not None:
+                response = future.result()
+                response.raise_for_status()
+                
+                next_url = response.headers.get("x-pagination-next")
+                future = executor.submit(self.request, "GET", next_url) if next_url else None
+                
+                for item in response.json():
+                    yield item
+        finally:
+            # Stop prefetching if the caller stops early
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+    
     def authenticate(self):
         try:
             url = f"{self.api_url}/auth"
@@ -29,12 +238,13 @@ class TaigaAPI:
                 "password": self.password
             }
             
-            response = requests.post(url, json=payload)
+            self.credentials_rejected = False
+            response = self._send("POST", url, json=payload)
+            self.credentials_rejected = response.status_code in (400, 401, 403)
             response.raise_for_status()
             
             auth_data = response.json()
-            self.auth_token = auth_data.get("auth_token")
-            self.refresh_token = auth_data.get("refresh")
+            self._set_tokens(auth_data.get("auth_token"), auth_data.get("refresh"))
             self.user_id = auth_data.get("id")
             
             if self.auth_token:
@@ -61,12 +271,11 @@ class TaigaAPI:
                 "refresh": self.refresh_token
             }
             
-            response = requests.post(url, json=payload)
+            response = self._send("POST", url, json=payload)
             response.raise_for_status()
             
             auth_data = response.json()
-            self.auth_token = auth_data.get("auth_token")
-            self.refresh_token = auth_data.get("refresh")
+            self._set_tokens(auth_data.get("auth_token"), auth_data.get("refresh"))
             
             if self.auth_token:
                 print("✅ Authentication token refreshed")
@@ -80,19 +289,18 @@ class TaigaAPI:
             return self.authenticate()
     
     def get_headers(self):
-        return {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.auth_token}" if self.auth_token else None
-        }
+        headers = {"Content-Type": "application/json"}
+        if self.auth_token:
+            headers["Authorization"] = f"Bearer {self.auth_token}"
+        return headers
     
     def get_user_info(self):
-        if not self.auth_token:
-            if not self.authenticate():
-                return None
+        if not self.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.api_url}/users/me"
-            response = requests.get(url, headers=self.get_headers())
+            response = self.request("GET", url)
             response.raise_for_status()
             user_data = response.json()
             print(f"✅ Retrieved user info for {user_data.get('username')}")
@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+class TaskGraph:
+    """
+    Runs tasks on a thread pool as soon as the tasks they depend on succeed
+
+    Tasks may be added while others are already running, so work can be
+    scheduled while its inputs are still being produced. A task fails if
+    it raises or returns None (the managers' way of reporting failure);
+    tasks depending on a failed one are skipped.
+    """
+
+    def __init__(self, max_workers: int, on_done: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> None:
+        """
+        Args:
+            max_workers: Tasks run at once
+            on_done: Optional callback invoked with each task's key and state when it finishes
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task-graph")
+        self._changed = threading.Condition()
+        self._tasks = {}
+        self._dependents = {}
+        self._on_done = on_done
+
+    def add(self, key: str, function: Callable[..., Any], depends_on: Iterable[str] = ()) -> None:
+        """
+        Schedule function(*results of depends_on) once every dependency has succeeded
+
+        Dependencies may be added later than the task itself.
+        """
+        with self._changed:
+            if key in self._tasks:
+                raise ValueError(f"Task '{key}' already exists")
+            self._tasks[key] = {"function": function, "depends_on": list(depends_on),
+                                "status": "pending", "result": None, "error": None}
+            for dep in self._tasks[key]["depends_on"]:
+                self._dependents.setdefault(dep, []).append(key)
+            self._schedule(key)
+
+    def join(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait for every task; tasks whose dependencies were never added are skipped
+
+        Returns:
+            Dict of task key to {"status", "result", "error"} where status is
+            "succeeded", "failed" or "skipped"
+        """
+        with self._changed:
+            for key, task in self._tasks.items():
+                missing = [dep for dep in task["depends_on"] if dep not in self._tasks]
+                if task["status"] == "pending" and missing:
+                    self._settle(key, "skipped", error=f"Missing dependency '{missing[0]}'")
+            while any(task["status"] in ("pending", "running") for task in self._tasks.values()):
+                self._changed.wait()
+            results = {key: {"status": task["status"], "result": task["result"], "error": task["error"]}
+                       for key, task in self._tasks.items()}
+        self._executor.shutdown(wait=True)
+        return results
+
+    def _schedule(self, key: str) -> None:
+        """Start, skip or keep waiting on a pending task (called with the lock held)"""
+        task = self._tasks[key]
+        if task["status"] != "pending":
+            return
+        dependencies = [self._tasks.get(dep) for dep in task["depends_on"]]
+        for dep, dependency in zip(task["depends_on"], dependencies):
+            if dependency is not None and dependency["status"] in ("failed", "skipped"):
+                self._settle(key, "skipped", error=f"Blocked by '{dep}': {dependency['error']}")
+                return
+        if all(dependency is not None and dependency["status"] == "succeeded" for dependency in dependencies):
+            task["status"] = "running"
+            self._executor.submit(self._run, key, [dependency["result"] for dependency in dependencies])
+
+    def _run(self, key: str, arguments: list) -> None:
+        task = self._tasks[key]
+        try:
+            result = task["function"](*arguments)
+            status, error = ("succeeded", None) if result is not None else ("failed", "Task returned no result")
+        except Exception as e:
+            result, status, error = None, "failed", str(e)
+        with self._changed:
+            self._settle(key, status, result, error)
+
+    def _settle(self, key: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        """Record a final state and start or skip dependents (called with the lock held)"""
+        task = self._tasks[key]
+        task.update(status=status, result=result, error=error)
+        self._changed.notify_all()
+        if self._on_done:
+            try:
+                self._on_done(key, task)
+            except Exception as e:
+                print(f"⚠️ Task graph callback failed: {e}")
+        for dependent in self._dependents.get(key, []):
+            self._schedule(dependent)
@@ -1,21 +1,25 @@
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 class UserStoryManager:
     def __init__(self, taiga_api):
         self.taiga = taiga_api
     
     def get_user_stories(self, epic_id=None):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.taiga.api_url}/userstories" 
             if epic_id is not None:
                 url = f"{self.taiga.api_url}/epics/{epic_id}/related_userstories"
-            response = requests.get(url, headers=self.taiga.get_headers())
+            cached = self.taiga.cache.get(url)
+            if cached is not None:
+                return cached
+            response = self.taiga.request("GET", url, headers={"x-disable-pagination": "True"})
             response.raise_for_status()
             stories = response.json()
+            self.taiga.cache.set(url, stories)
                 
             return stories
             
@@ -23,11 +27,24 @@ class UserStoryManager:
             print(f"❌ Failed to get user stories: {e}")
             return None
     
+    def iter_user_stories(self, epic_id=None):
+        """Lazily iterate over user stories, optionally those related to an epic"""
+        if not self.taiga.ensure_authenticated():
+            raise RuntimeError("Taiga authentication failed")
+        
+        url = f"{self.taiga.api_url}/userstories"
+        if epic_id is not None:
+            url = f"{self.taiga.api_url}/epics/{epic_id}/related_userstories"
+        try:
+            yield from self.taiga.iter_pages(url)
+        except Exception as e:
+            print(f"❌ Failed to iterate user stories: {e}")
+            raise
+    
     def create_user_story(self, subject, project_id, description=None,
                           assigned_to=None, tags=None, status=None, points=None):
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return None
+        if not self.taiga.ensure_authenticated():
+            return None
         
         try:
             url = f"{self.taiga.api_url}/userstories"
@@ -50,9 +67,11 @@ class UserStoryManager:
             if points:
                 payload["points"] = points
             
-            response = requests.post(url, headers=self.taiga.get_headers(), json=payload)
+            response = self.taiga.request("POST", url, json=payload)
             response.raise_for_status()
             story = response.json()
+            self.taiga.cache.invalidate(url)
+            self._index_story(story)
             # print(f"✅ Created user story '{subject}'")
             return story
             
@@ -73,9 +92,8 @@ class UserStoryManager:
         Returns:
             Boolean indicating success
         """
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return False
+        if not self.taiga.ensure_authenticated():
+            return False
         
         try:
             # Use the dedicated endpoint for linking user stories to epics
@@ -86,8 +104,9 @@ class UserStoryManager:
                 "user_story": user_story_id
             }
             
-            response = requests.post(url, headers=self.taiga.get_headers(), json=payload)
+            response = self.taiga.request("POST", url, json=payload)
             response.raise_for_status()
+            self.taiga.cache.invalidate(url)
             # print(f"✅ Linked user story {user_story_id} to epic {epic_id}")
             return True
             
@@ -97,6 +116,196 @@ class UserStoryManager:
                 print(f"Response: {e.response.text}")
             return False
 
+    def update_user_story(self, user_story_id, updates):
+        """
+        Partially update a user story
+        
+        Args:
+            user_story_id: User story ID
+            updates: Fields to update; Taiga requires the current "version"
+            
+        Returns:
+            Updated user story or None
+        """
+        if not self.taiga.ensure_authenticated():
+            return None
+        
+        try:
+            url = f"{self.taiga.api_url}/userstories/{user_story_id}"
+            response = self.taiga.request("PATCH", url, json=updates)
+            response.raise_for_status()
+            self._invalidate_story_lists()
+            story = response.json()
+            self._index_story(story)
+            return story
+            
+        except Exception as e:
+            print(f"❌ Failed to update user story: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return None
+    
+    def bulk_create_related_user_stories(self, project_id, epic_id, subjects):
+        """
+        Create several user stories already linked to an epic with a single request
+        
+        Args:
+            project_id: Project ID
+            epic_id: Epic ID
+            subjects: List of story subjects (Taiga's bulk endpoint takes subjects only)
+            
+        Returns:
+            Boolean indicating success
+        """
+        if not self.taiga.ensure_authenticated():
+            return False
+        
+        try:
+            url = f"{self.taiga.api_url}/epics/{epic_id}/related_userstories/bulk_create"
+            
+            # The bulk endpoint splits subjects on newlines
+            payload = {
+                "project_id": project_id,
+                "bulk_userstories": "\n".join(" ".join(subject.split()) for subject in subjects)
+            }
+            
+            response = self.taiga.request("POST", url, json=payload)
+            response.raise_for_status()
+            self._invalidate_story_lists()
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to bulk create user stories for epic: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response: {e.response.text}")
+            return False
+    
+    def _list_epic_stories(self, epic_id, attempts=3):
+        """
+        List an epic's user stories with subjects and versions, retrying failures
+        
+        Returns:
+            List of user stories, or None if every attempt failed
+        """
+        for attempt in range(attempts):
+            try:
+                return list(self.taiga.iter_pages(f"{self.taiga.api_url}/userstories", {"epic": epic_id}))
+            except Exception as e:
+                print(f"⚠️ Failed to list user stories of epic {epic_id} (attempt {attempt + 1}/{attempts}): {e}")
+                if attempt + 1 < attempts:
+                    time.sleep(0.5 * 2 ** attempt)
+        return None
+    
+    def create_stories_for_epic(self, project_id, epic_id, stories_data, on_result=None):
+        """
+        Create user stories and link them to an epic
+        
+        Uses the epic's bulk-create endpoint, which creates and links the
+        stories in one request, then lists the epic's stories once and fills
+        in descriptions concurrently: about N+2 requests for N stories.
+        Stories are created individually only when the bulk request itself
+        failed (or had no subject to send); once it succeeded nothing is
+        created again, and stories whose details could not be loaded are
+        reported as created without a description.
+        
+        Args:
+            project_id: Project ID
+            epic_id: Epic ID
+            stories_data: List of dicts with "subject" and "description"
+            on_result: Optional callback invoked with each result as it completes
+            
+        Returns:
+            List of per-story results in input order, each a dict with
+            "subject", "story" (None on failure; without an ID when created but
+            not loaded), "linked" and "error"
+        """
+        if not stories_data:
+            return []
+        
+        subjects = [" ".join((data.get("subject") or "").split()) for data in stories_data]
+        bulk = [index for index, subject in enumerate(subjects) if subject]
+        bulk_created = bool(bulk) and self.bulk_create_related_user_stories(
+            project_id, epic_id, [subjects[index] for index in bulk]
+        )
+        
+        # Match created stories by subject, newest first so older stories with the same subject are left alone
+        created = {}
+        epic_stories = self._list_epic_stories(epic_id) if bulk_created else None
+        if epic_stories is not None:
+            available = sorted(epic_stories, key=lambda story: story.get("id") or 0, reverse=True)
+            for index in bulk:
+                for story in available:
+                    if " ".join((story.get("subject") or "").split()) == subjects[index]:
+                        created[index] = story
+                        available.remove(story)
+                        break
+            if len(created) != len(bulk):
+                print(f"⚠️ Bulk create listed {len(created)} of {len(bulk)} stories for epic {epic_id}")
+            for story in created.values():
+                self._index_story(story)
+        
+        def complete_bulk_story(story, data):
+            result = {"subject": story.get("subject"), "story": story, "linked": True, "error": None}
+            description = data.get("description")
+            if description:
+                updated = self.update_user_story(story.get("id"), {
+                    "description": description,
+                    "version": story.get("version")
+                })
+                if updated:
+                    result["story"] = updated
+                else:
+                    result["error"] = "Failed to set description"
+            return result
+        
+        def complete(index):
+            if index in created:
+                result = complete_bulk_story(created[index], stories_data[index])
+            elif bulk_created and index in bulk:
+                # Creating it again would leave a duplicate in Taiga
+                subject = stories_data[index].get("subject")
+                result = {
+                    "subject": subject, "story": {"id": None, "subject": subject}, "linked": True,
+                    "error": "Created by the bulk request, but its details could not be loaded; description not set"
+                }
+            else:
+                result = self.create_story_for_epic(project_id, epic_id, stories_data[index])
+            if on_result:
+                on_result(result)
+            return result
+        
+        workers = max(1, min(self.taiga.pool_size, len(stories_data)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(complete, range(len(stories_data))))
+    
+    def create_story_for_epic(self, project_id, epic_id, story_data):
+        """
+        Create one user story and link it to an epic
+        
+        Args:
+            project_id: Project ID
+            epic_id: Epic ID
+            story_data: Dict with "subject" and "description"
+            
+        Returns:
+            Result dict with "subject", "story" (None on failure), "linked" and "error"
+        """
+        subject = story_data.get("subject")
+        result = {"subject": subject, "story": None, "linked": False, "error": None}
+        story = self.create_user_story(
+            subject=subject,
+            project_id=project_id,
+            description=story_data.get("description")
+        )
+        if not story:
+            result["error"] = "Failed to create user story"
+            return result
+        result["story"] = story
+        result["linked"] = self.link_user_story_to_epic(story.get("id"), epic_id)
+        if not result["linked"]:
+            result["error"] = "Failed to link to epic"
+        return result
+    
     def delete_user_story(self, user_story_id):
         """
         Delete a user story by its ID
@@ -107,16 +316,28 @@ class UserStoryManager:
         Returns:
             Boolean indicating success
         """
-        if not self.taiga.auth_token:
-            if not self.taiga.authenticate():
-                return False
+        if not self.taiga.ensure_authenticated():
+            return False
 
         try:
             url = f"{self.taiga.api_url}/userstories/{user_story_id}"
-            response = requests.delete(url, headers=self.taiga.get_headers())
+            response = self.taiga.request("DELETE", url)
             response.raise_for_status()
+            self._invalidate_story_lists()
+            if self.taiga.duplicate_index is not None:
+                self.taiga.duplicate_index.remove(user_story_id)
             print(f"\u2705 Deleted user story with ID {user_story_id}")
             return True
         except Exception as e:
             print(f"\u274c Failed to delete user story: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def _invalidate_story_lists(self):
+        """Drop cached story lists, including every epic's related stories"""
+        self.taiga.cache.invalidate(f"{self.taiga.api_url}/userstories")
+        self.taiga.cache.invalidate_if(lambda key: key.endswith("/related_userstories"))
+    
+    def _index_story(self, story):
+        """Keep the duplicate index, if any, in step with a created or updated story"""
+        if self.taiga.duplicate_index is not None and isinstance(story, dict) and story.get("id"):
+            self.taiga.duplicate_index.add(story)
@@ -1,23 +1,41 @@
 import json
-import requests
+from itertools import islice
+from job_queue import FINISHED_STATUSES
+from result_shaping import SUMMARY_CHARS, decode_cursor, html_to_text, project_fields, resolve_fields, shape_page
 
-def list_epics(epic_manager, project_id):
+PROJECT_FIELDS = ["id", "name", "slug", "description", "members", "total_story_points"]
+EPIC_FIELDS = ["id", "ref", "subject", "status", "description", "user_stories"]
+USER_STORY_FIELDS = ["id", "ref", "subject", "status", "description", "epics", "total_points"]
+
+def list_epics(epic_manager, project_id, limit=None, cursor=None, fields=None, mirror=None):
     try:
-        epics = epic_manager.get_epics(project_id)
+        complete = not limit
+        if mirror is not None and mirror.is_fresh():
+            epics = mirror.list_epics(project_id)
+            complete = True
+        elif limit:
+            # Stream pages and stop once the cap is reached; one extra item tells whether more exist
+            epics = list(islice(epic_manager.iter_epics(project_id), decode_cursor(cursor) + int(limit) + 1))
+        else:
+            epics = epic_manager.get_epics(project_id)
         if epics is None:
             return json.dumps({"status": "error", "message": f"Error retrieving epics for project {project_id}"})
 
-        formatted_epics = []
-        for epic in epics:
-            formatted_epics.append({
+        fields = resolve_fields(fields, EPIC_FIELDS, ["id", "subject"])
+        
+        def format_epic(epic):
+            return project_fields({
                 "id": epic.get("id"),
-                "subject": epic.get("subject")
-            })
+                "ref": epic.get("ref"),
+                "subject": epic.get("subject"),
+                "status": (epic.get("status_extra_info") or {}).get("name", "Unknown"),
+                "description": html_to_text(epic.get("description"), SUMMARY_CHARS),
+                "user_stories": (epic.get("user_stories_counts") or {}).get("total")
+            }, fields)
             
         return json.dumps({
-            "status": "success", 
-            "epics": formatted_epics,
-            "count": len(formatted_epics)
+            "status": "success",
+            **shape_page(epics, "epics", "list_epics", cursor, format_epic, limit and int(limit), complete)
         })
         
     except Exception as e:
@@ -67,34 +85,54 @@ def update_epic(epic_manager, epic_id, updates):
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
-def list_user_stories(user_story_manager, epic_id=None):
+def list_user_stories(user_story_manager, epic_id=None, limit=None, cursor=None, fields=None, mirror=None):
     try:
-        stories = user_story_manager.get_user_stories(epic_id)
+        complete = not limit
+        if mirror is not None and mirror.is_fresh():
+            stories = mirror.list_user_stories(epic_id)
+            complete = True
+        elif limit:
+            stories = list(islice(user_story_manager.iter_user_stories(epic_id), decode_cursor(cursor) + int(limit) + 1))
+        else:
+            stories = user_story_manager.get_user_stories(epic_id)
         
         if stories is None:
             return json.dumps({"status": "error", "message": "Error retrieving user stories"})
             
-        formatted_stories = []
-        for story in stories:
-            formatted_stories.append({
+        fields = resolve_fields(fields, USER_STORY_FIELDS, ["id", "subject", "description", "status"])
+        
+        def format_story(story):
+            return project_fields({
                 "id": story.get("id"),
+                "ref": story.get("ref"),
                 "subject": story.get("subject"),
-                "description": story.get("description", "").replace("<p>", "").replace("</p>", "")[:100] + "..." if story.get("description") else "",
-                "status": story.get("status_extra_info", {}).get("name", "Unknown")
-            })
+                "status": (story.get("status_extra_info") or {}).get("name", "Unknown"),
+                "description": html_to_text(story.get("description"), SUMMARY_CHARS),
+                "epics": [epic.get("id") for epic in story.get("epics") or []],
+                "total_points": story.get("total_points")
+            }, fields)
             
         return json.dumps({
-            "status": "success", 
-            "user_stories": formatted_stories,
-            "count": len(formatted_stories)
+            "status": "success",
+            **shape_page(stories, "user_stories", "list_user_stories", cursor, format_story, limit and int(limit), complete)
         })
         
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
-def create_user_story(user_story_manager, subject, project_id ,description=None):
+def create_user_story(user_story_manager, subject, project_id, description=None, allow_duplicate=False):
     try:
-        epic_id = int(epic_id) if epic_id else None
+        index = user_story_manager.taiga.duplicate_index
+        if index is not None and not allow_duplicate:
+            match = index.find(project_id, subject, description)
+            if match:
+                return json.dumps({
+                    "status": "duplicate",
+                    "message": f"Story {match['id']} '{match['subject']}' looks the same (similarity {match['score']}). "
+                               "Not created; call again with allow_duplicate true to create it anyway.",
+                    "duplicate_of": match
+                })
+        
         story = user_story_manager.create_user_story(
             subject=subject,
             project_id=project_id,
@@ -116,29 +154,50 @@ def create_user_story(user_story_manager, subject, project_id ,description=None)
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
-def list_projects(project_manager):
+def list_projects(project_manager, limit=None, cursor=None, fields=None, mirror=None):
     try:
-        projects = project_manager.get_projects()
+        complete = not limit
+        if mirror is not None and mirror.is_fresh():
+            projects = mirror.list_projects()
+            complete = True
+        elif limit:
+            projects = list(islice(project_manager.iter_projects(), decode_cursor(cursor) + int(limit) + 1))
+        else:
+            projects = project_manager.get_projects()
         if projects is None:
             return json.dumps({"status": "error", "message": "Error retrieving projects"})
 
-        formatted_projects = []
-        for project in projects:
-            formatted_projects.append({
+        fields = resolve_fields(fields, PROJECT_FIELDS, ["id", "name", "description"])
+        
+        def format_project(project):
+            return project_fields({
                 "id": project.get("id"),
                 "name": project.get("name"),
-                "description": project.get("description", "").replace("<p>", "").replace("</p>", "") if project.get("description") else ""
-            })
+                "slug": project.get("slug"),
+                "description": html_to_text(project.get("description"), SUMMARY_CHARS),
+                "members": len(project.get("members") or []),
+                "total_story_points": project.get("total_story_points")
+            }, fields)
             
         return json.dumps({
-            "status": "success", 
-            "projects": formatted_projects,
-            "count": len(formatted_projects)
+            "status": "success",
+            **shape_page(projects, "projects", "list_projects", cursor, format_project, limit and int(limit), complete)
         })
         
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
+def search_backlog(mirror, query, project_id=None, kinds=None, limit=None):
+    try:
+        if not mirror.ensure_fresh():
+            return json.dumps({"status": "error", "message": "Could not sync the local Taiga mirror"})
+        
+        hits = mirror.search(query, project_id, kinds, int(limit or 20))
+        return json.dumps({"status": "success", "results": hits, "count": len(hits)})
+        
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
 def get_project(project_manager, project_id):
     try:
         project_id = int(project_id)
@@ -152,7 +211,7 @@ def get_project(project_manager, project_id):
             "project": {
                 "id": project.get("id"),
                 "name": project.get("name"),
-                "description": project.get("description", "").replace("<p>", "").replace("</p>", "") if project.get("description") else "",
+                "description": html_to_text(project.get("description"), 2000),
                 "members": len(project.get("members", [])),
                 "total_milestones": project.get("total_milestones", 0),
                 "total_story_points": project.get("total_story_points", 0)
@@ -181,28 +240,162 @@ def create_project(project_manager, name, description=None):
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
 
-def breakdown_epic(story_generator, epic_id, project_id):
+def breakdown_epic(story_generator, job_queue, epic_id, project_id, background=True, session_id=None, progress=None):
     try:
         project_id = int(project_id)
         epic_id = int(epic_id)
-        stories = story_generator.breakdown_epic_into_stories(project_id, epic_id)
         
-        if not stories:
+        # Long breakdowns run as a job so the chat request returns right away
+        if background and job_queue is not None:
+            job_id = job_queue.submit("breakdown_epic", {"epic_id": epic_id, "project_id": project_id}, session_id)
+            return json.dumps({
+                "status": "queued",
+                "job_id": job_id,
+                "message": f"Breaking down epic {epic_id} in the background. Use get_job_status with job_id {job_id} to check on it."
+            })
+        
+        results = story_generator.breakdown_epic_into_stories(project_id, epic_id, progress=progress)
+        formatted_stories, failures, duplicates = _format_breakdown_results(results)
+        
+        if not formatted_stories and not duplicates:
             return json.dumps({"status": "error", "message": f"Failed to break down epic {epic_id}"})
             
-        formatted_stories = []
-        for story in stories:
+        return json.dumps({
+            "status": "partial" if failures else "success",
+            "user_stories": formatted_stories,
+            "count": len(formatted_stories),
+            "failures": failures,
+            "skipped_duplicates": duplicates
+        })
+        
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
+def breakdown_project(story_generator, job_queue, project_id, background=True, session_id=None, progress=None):
+    try:
+        project_id = int(project_id)
+        
+        if background and job_queue is not None:
+            job_id = job_queue.submit("breakdown_project", {"project_id": project_id}, session_id)
+            return json.dumps({
+                "status": "queued",
+                "job_id": job_id,
+                "message": f"Breaking down every epic of project {project_id} in the background. Use get_job_status with job_id {job_id} to check on it."
+            })
+        
+        outcomes = story_generator.breakdown_project(project_id, progress=progress)
+        if outcomes is None:
+            return json.dumps({"status": "error", "message": f"Failed to list epics of project {project_id}"})
+        
+        epics = []
+        for outcome in outcomes:
+            formatted_stories, failures, duplicates = _format_breakdown_results(outcome["results"])
+            if outcome["error"]:
+                failures.append({"subject": outcome["subject"], "error": outcome["error"]})
+            epics.append({
+                "epic_id": outcome["epic_id"],
+                "subject": outcome["subject"],
+                "status": "error" if not formatted_stories and not duplicates else "partial" if failures else "success",
+                "user_stories": formatted_stories,
+                "count": len(formatted_stories),
+                "failures": failures,
+                "skipped_duplicates": duplicates
+            })
+        
+        failed = [epic for epic in epics if epic["status"] != "success"]
+        return json.dumps({
+            "status": "error" if epics and len(failed) == len(epics) else "partial" if failed else "success",
+            "epics": epics,
+            "epic_count": len(epics),
+            "story_count": sum(epic["count"] for epic in epics)
+        })
+        
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
+def plan_backlog(backlog_planner, job_queue, requirements, project_id=None, background=True, session_id=None, progress=None):
+    try:
+        project_id = int(project_id) if project_id not in (None, "") else None
+        
+        # One model call plans the whole tree; creating it still takes a while, so it runs as a job
+        if background and job_queue is not None:
+            job_id = job_queue.submit("plan_backlog", {"requirements": requirements, "project_id": project_id}, session_id)
+            return json.dumps({
+                "status": "queued",
+                "job_id": job_id,
+                "message": f"Planning the backlog in the background. Use get_job_status with job_id {job_id} to check on it."
+            })
+        
+        plan = backlog_planner.plan_backlog(requirements, project_id, progress=progress)
+        if plan is None:
+            return json.dumps({"status": "error", "message": "Failed to plan a backlog from the requirements"})
+        
+        epics = [epic for epic in plan["epics"] if epic["id"] is not None]
+        if not epics:
+            status = "error"
+        elif plan["failures"]:
+            status = "partial"
+        else:
+            status = "success"
+        return json.dumps({
+            "status": status,
+            "project": plan["project"],
+            "epics": plan["epics"],
+            "epic_count": len(epics),
+            "story_count": sum(len(epic["stories"]) for epic in plan["epics"]),
+            "failures": plan["failures"],
+            "skipped_duplicates": plan["skipped_duplicates"]
+        })
+        
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
+def _format_breakdown_results(results):
+    """Split per-story breakdown results into created stories, failures and skipped duplicates"""
+    formatted_stories = []
+    failures = []
+    duplicates = []
+    for result in results:
+        story = result.get("story")
+        if story:
             formatted_stories.append({
                 "id": story.get("id"),
                 "subject": story.get("subject"),
-                "permalink": story.get("permalink", "")
+                "permalink": story.get("permalink", ""),
+                "linked": result.get("linked", False)
             })
-            
-        return json.dumps({
+        if result.get("error"):
+            failures.append({
+                "subject": result.get("subject"),
+                "error": result.get("error")
+            })
+        if result.get("duplicate_of"):
+            duplicates.append({
+                "subject": result.get("subject"),
+                "duplicate_of": result.get("duplicate_of")
+            })
+    return formatted_stories, failures, duplicates
+
+def get_job_status(job_queue, job_id):
+    try:
+        job = job_queue.get(job_id)
+        if not job:
+            return json.dumps({"status": "error", "message": f"Job {job_id} not found"})
+        
+        response = {
             "status": "success",
-            "user_stories": formatted_stories,
-            "count": len(formatted_stories)
-        })
+            "job": {
+                "id": job["id"],
+                "kind": job["kind"],
+                "job_status": job["status"],
+                "progress": job["progress"]
+            }
+        }
+        if job["status"] in FINISHED_STATUSES:
+            response["job"]["result"] = json.loads(job["result"]) if job["result"] else None
+            response["job"]["error"] = job["error"]
+            job_queue.mark_delivered([job["id"]])
+        return json.dumps(response)
         
     except Exception as e:
         return json.dumps({"status": "error", "message": str(e)})
@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taigaApi.json_stream import JSONArrayStreamParser
+
+STORIES = [
+    {"subject": "As a user I want to log in", "description": "Login form"},
+    {"subject": "As an admin I want to ban users", "description": "Ban button"},
+]
+
+def parse_chunks(chunks):
+    """Feed the chunks one by one and collect every completed element"""
+    parser = JSONArrayStreamParser()
+    elements = []
+    for chunk in chunks:
+        elements += parser.feed(chunk)
+    return elements, parser
+
+def split_every(text, size):
+    return [text[index:index + size] for index in range(0, len(text), size)]
+
+class JSONArrayStreamParserTest(unittest.TestCase):
+
+    def test_bare_array(self):
+        elements, parser = parse_chunks([json.dumps(STORIES)])
+        self.assertEqual(elements, STORIES)
+        self.assertTrue(parser.done)
+
+    def test_wrapped_array(self):
+        elements, parser = parse_chunks([json.dumps({"stories": STORIES})])
+        self.assertEqual(elements, STORIES)
+        self.assertTrue(parser.done)
+
+    def test_code_fence(self):
+        text = "Here are the stories:\n```json\n" + json.dumps({"stories": STORIES}, indent=2) + "\n```\nAnything else?"
+        elements, parser = parse_chunks([text])
+        self.assertEqual(elements, STORIES)
+        self.assertTrue(parser.done)
+
+    def test_bracketed_prose_before_json(self):
+        text = "The stories [draft] for {epic} follow:\n" + json.dumps(STORIES)
+        elements, parser = parse_chunks([text])
+        self.assertEqual(elements, STORIES)
+        self.assertTrue(parser.done)
+
+    def test_escaped_quotes_and_braces_in_strings(self):
+        stories = [
+            {"subject": "Say \"hi\" {politely}", "description": "Back\\slash ] and [ and } inside"},
+            {"subject": "Tab\there", "description": "Unicode \u00e9 and a quote \" at the end\""},
+        ]
+        elements, _ = parse_chunks([json.dumps({"stories": stories})])
+        self.assertEqual(elements, stories)
+
+    def test_chunk_boundaries_inside_strings_and_escapes(self):
+        stories = [{"subject": "Say \"hi\" {now}", "description": "Path C:\\temp ] [ }"}, *STORIES]
+        text = "```json\n" + json.dumps({"stories": stories}) + "\n```"
+        for size in (1, 2, 3, 7):
+            with self.subTest(chunk_size=size):
+                elements, parser = parse_chunks(split_every(text, size))
+                self.assertEqual(elements, stories)
+                self.assertTrue(parser.done)
+
+    def test_elements_are_returned_as_they_complete(self):
+        parser = JSONArrayStreamParser()
+        text = json.dumps(STORIES)
+        first_end = text.index("}") + 1
+        self.assertEqual(parser.feed(text[:first_end]), [STORIES[0]])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.feed(text[first_end:]), [STORIES[1]])
+        self.assertTrue(parser.done)
+
+    def test_text_after_the_array_is_ignored(self):
+        elements, _ = parse_chunks([json.dumps(STORIES) + ' and also [{"subject": "extra"}]'])
+        self.assertEqual(elements, STORIES)
+
+if __name__ == "__main__":
+    unittest.main()
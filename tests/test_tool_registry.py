@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import taiga_functions
+from tool_registry import ToolRegistry
+
+PROJECTS = [{"id": 1, "name": "Finance Software", "description": "Budgets"}]
+EPICS = [{"id": 2, "subject": "Authentication", "project": 1}]
+STORIES = [{"id": 3, "subject": "As a user I want to log in", "description": "Login form"}]
+
+class FakeProjectManager:
+    def get_projects(self):
+        return PROJECTS
+
+    def iter_projects(self):
+        return iter(PROJECTS)
+
+class FakeEpicManager:
+    def get_epics(self, project_id):
+        return [epic for epic in EPICS if epic["project"] == int(project_id)]
+
+    def iter_epics(self, project_id=None):
+        return iter(self.get_epics(project_id))
+
+class FakeUserStoryManager:
+    def get_user_stories(self, epic_id=None):
+        return STORIES
+
+    def iter_user_stories(self, epic_id=None):
+        return iter(STORIES)
+
+class FakeMirror:
+    def __init__(self, fresh):
+        self.fresh = fresh
+
+    def is_fresh(self):
+        return self.fresh
+
+    def list_projects(self):
+        return PROJECTS
+
+    def list_epics(self, project_id=None):
+        return EPICS
+
+    def list_user_stories(self, epic_id=None):
+        return STORIES
+
+class ListToolsThroughRegistryTest(unittest.TestCase):
+    """List tools take their dependencies in the middle of the signature; the registry must pass them by name"""
+
+    def make_registry(self, mirror):
+        return ToolRegistry.from_file(taiga_functions, {
+            "project_manager": FakeProjectManager(),
+            "epic_manager": FakeEpicManager(),
+            "user_story_manager": FakeUserStoryManager(),
+            "mirror": mirror,
+            # Needed to bind the other tools; not used by the list tools
+            "story_generator": None,
+            "backlog_planner": None,
+            "job_queue": None,
+        })
+
+    def call(self, registry, name, arguments):
+        result = json.loads(registry.call(name, json.dumps(arguments)))
+        self.assertEqual(result["status"], "success", result)
+        return result
+
+    def test_list_tools(self):
+        for mirror in (FakeMirror(fresh=False), FakeMirror(fresh=True)):
+            with self.subTest(mirror_fresh=mirror.fresh):
+                registry = self.make_registry(mirror)
+                projects = self.call(registry, "list_projects", {})
+                self.assertEqual([project["id"] for project in projects["projects"]], [1])
+
+                epics = self.call(registry, "list_epics", {"project_id": "1"})
+                self.assertEqual([epic["id"] for epic in epics["epics"]], [2])
+
+                stories = self.call(registry, "list_user_stories", {"epic_id": "2"})
+                self.assertEqual([story["id"] for story in stories["user_stories"]], [3])
+
+    def test_list_tools_with_limit(self):
+        registry = self.make_registry(FakeMirror(fresh=False))
+        self.call(registry, "list_projects", {"limit": 1})
+        self.call(registry, "list_epics", {"project_id": "1", "limit": 1})
+        self.call(registry, "list_user_stories", {"epic_id": "2", "limit": 1})
+
+if __name__ == "__main__":
+    unittest.main()
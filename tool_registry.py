@@ -0,0 +1,194 @@
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from metrics import REGISTRY
+
+# Tool schemas live next to this module, independent of the working directory
+TOOLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "taiga_tools.json")
+
+REGISTRY.define("tool_call_errors_total", "counter", "Agent tool calls that returned or raised an error")
+
+def _coerce_string(value: Any) -> str:
+    return value if isinstance(value, str) else str(value)
+
+def _coerce_integer(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError("expected an integer")
+    return int(value)
+
+def _coerce_number(value: Any) -> float:
+    return float(value)
+
+def _coerce_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("true", "1", "yes"):
+        return True
+    if str(value).lower() in ("false", "0", "no"):
+        return False
+    raise ValueError("expected a boolean")
+
+def _coerce_json(expected_type: type) -> Callable[[Any], Any]:
+    def coerce(value: Any) -> Any:
+        # Models sometimes send nested objects as JSON-encoded strings
+        if isinstance(value, str):
+            value = json.loads(value)
+        if not isinstance(value, expected_type):
+            raise ValueError(f"expected {'an array' if expected_type is list else 'an object'}")
+        return value
+    return coerce
+
+# Handler parameters filled from the caller's context rather than the model
+CONTEXT_PARAMETERS = ("session_id",)
+
+COERCERS = {
+    "string": _coerce_string,
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "boolean": _coerce_boolean,
+    "array": _coerce_json(list),
+    "object": _coerce_json(dict),
+}
+
+
+class BoundTool:
+    """A tool schema bound to its handler with precompiled argument handling"""
+
+    def __init__(self, schema: Dict[str, Any], handler: Callable[..., str], dependencies: Dict[str, Any]) -> None:
+        function = schema["function"]
+        self.name = function["name"]
+        self.handler = handler
+
+        parameters = function.get("parameters", {})
+        properties = parameters.get("properties", {})
+        required = set(parameters.get("required", []))
+        signature = inspect.signature(handler)
+
+        unknown = set(properties) - set(signature.parameters)
+        unknown |= set(properties) & set(CONTEXT_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Tool '{self.name}' declares arguments its handler does not accept: {sorted(unknown)}")
+
+        # Dependencies (managers, generators) are resolved once here and passed by name,
+        # so they may sit anywhere in the handler's signature
+        self.bound_dependencies = []
+        # (name, coercer, required, pass None when missing)
+        self.arguments = []
+        self.context_parameters = []
+        for param in signature.parameters.values():
+            if param.name in dependencies:
+                self.bound_dependencies.append((param.name, dependencies[param.name]))
+            elif param.name in CONTEXT_PARAMETERS:
+                self.context_parameters.append(param.name)
+            elif param.name in properties:
+                coercer = COERCERS.get(properties[param.name].get("type"), lambda value: value)
+                needs_value = param.default is inspect.Parameter.empty
+                self.arguments.append((param.name, coercer, param.name in required, needs_value))
+            elif param.default is inspect.Parameter.empty:
+                raise ValueError(f"Handler for tool '{self.name}' needs '{param.name}', which is neither a dependency nor a schema property")
+
+    def build_arguments(self, raw_args: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and coerce model-supplied arguments for the handler"""
+        kwargs = {}
+        for name, coercer, required, needs_value in self.arguments:
+            value = raw_args.get(name)
+            if value is None:
+                if required:
+                    raise ValueError(f"Missing required argument '{name}'")
+                if needs_value:
+                    kwargs[name] = None
+                continue
+            try:
+                kwargs[name] = coercer(value)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid argument '{name}': {e}")
+        return kwargs
+
+
+class ToolRegistry:
+    """Binds tool schemas to taiga_functions handlers and dispatches calls by name"""
+
+    def __init__(self, schemas: List[Dict[str, Any]], handlers: Any, dependencies: Dict[str, Any]) -> None:
+        """
+        Args:
+            schemas: Tool definitions in OpenAI function-calling format
+            handlers: Object (usually a module) with one function per tool name
+            dependencies: Objects injected into handler parameters of the same name
+        """
+        self.schemas = schemas
+        self._tools = {}
+        for schema in schemas:
+            name = schema["function"]["name"]
+            handler = getattr(handlers, name, None)
+            if handler is None:
+                raise ValueError(f"No handler found for tool '{name}'")
+            self._tools[name] = BoundTool(schema, handler, dependencies)
+
+        self._lock = threading.Lock()
+        self._stats = {name: {"calls": 0, "errors": 0, "total_seconds": 0.0} for name in self._tools}
+
+    @classmethod
+    def from_file(cls, handlers: Any, dependencies: Dict[str, Any], path: Optional[str] = None) -> "ToolRegistry":
+        """Load tool schemas from a JSON file and bind them"""
+        with open(path or TOOLS_PATH, "r") as file:
+            return cls(json.load(file), handlers, dependencies)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def call(self, name: str, arguments: Optional[str], context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Execute a tool call requested by the model
+
+        Args:
+            name: Tool name
+            arguments: JSON-encoded arguments from the model
+            context: Per-call values such as session_id for handlers that accept them
+
+        Returns:
+            JSON string with the tool result
+        """
+        tool = self._tools.get(name)
+        if tool is None:
+            return json.dumps({"status": "error", "message": f"Unknown function: {name}"})
+
+        started = time.perf_counter()
+        try:
+            kwargs = tool.build_arguments(json.loads(arguments or "{}"))
+            print(f"Calling function: {name} with args: {kwargs}")
+            for parameter in tool.context_parameters:
+                kwargs[parameter] = (context or {}).get(parameter)
+            kwargs.update(tool.bound_dependencies)
+            result = tool.handler(**kwargs)
+        except Exception as e:
+            result = json.dumps({"status": "error", "message": f"{name}: {e}"})
+        duration = time.perf_counter() - started
+
+        status = result_status(result)
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            stats["total_seconds"] += duration
+            if status == "error":
+                stats["errors"] += 1
+
+        REGISTRY.observe("tool_call_duration_seconds", duration, tool=name, status=status)
+        if status == "error":
+            REGISTRY.inc("tool_call_errors_total", tool=name)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-tool call counts, error counts and total time"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+def result_status(result: Optional[str]) -> str:
+    """Read the "status" field of a tool's JSON result"""
+    try:
+        return json.loads(result).get("status", "unknown")
+    except Exception:
+        return "unknown"